@@ -0,0 +1,101 @@
+import threading
+from contextlib import contextmanager
+import config
+
+ORDERS = "orders"
+SNAPSHOT = "snapshot"
+HISTORY = "history"
+
+class LaneBusy(Exception):
+    def __init__(self, lane, retry_after):
+        super().__init__(f"Troppe richieste in corso sulla coda {lane}")
+        self.lane = lane
+        self.retry_after = retry_after
+
+class Lane:
+    def __init__(self, name, priority, limit=0, shed=False):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.shed = shed
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            if self.limit and self.in_flight >= self.limit:
+                if self.shed:
+                    self.rejected += 1
+                    raise LaneBusy(self.name, config.LANE_RETRY_AFTER)
+                while self.in_flight >= self.limit:
+                    self._cond.wait()
+            self.in_flight += 1
+            self.admitted += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+lanes = {
+    ORDERS: Lane(ORDERS, 0, config.LANE_ORDERS_LIMIT),
+    SNAPSHOT: Lane(SNAPSHOT, 1, config.LANE_SNAPSHOT_LIMIT),
+    HISTORY: Lane(HISTORY, 2, config.LANE_HISTORY_LIMIT, shed=True),
+}
+
+_local = threading.local()
+
+def current_priority():
+    return getattr(_local, "priority", lanes[SNAPSHOT].priority)
+
+@contextmanager
+def priority(name):
+    previous = getattr(_local, "priority", None)
+    _local.priority = lanes[name].priority
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _local.priority
+        else:
+            _local.priority = previous
+
+@contextmanager
+def admit(name):
+    lane = lanes[name]
+    lane.acquire()
+    try:
+        with priority(name):
+            yield lane
+    finally:
+        lane.release()
+
+class Held:
+    def __init__(self, name, iterable):
+        self._name = name
+        self._lane = lanes[name]
+        self._iterable = iterable
+        self._lane.acquire()
+        self._released = False
+
+    def __iter__(self):
+        try:
+            with priority(self._name):
+                yield from self._iterable
+        finally:
+            self.close()
+
+    def close(self):
+        if hasattr(self._iterable, "close"):
+            self._iterable.close()
+        if not self._released:
+            self._released = True
+            self._lane.release()
+
+def stats():
+    return {
+        name: {"in_flight": lane.in_flight, "limit": lane.limit, "admitted": lane.admitted, "rejected": lane.rejected}
+        for name, lane in lanes.items()
+    }
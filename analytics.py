@@ -0,0 +1,183 @@
+from executor import mt5
+from history_store import from_msc
+from order_book import order_book
+from protocol import Result, fetch_history_deals
+from serialization import COLUMNAR, DEAL_FIELDS, FieldSpec, RECORDS, ROWS, to_arrays
+import config
+import logging
+import threading
+import time
+import numpy as np
+from datetime import datetime, timezone
+
+DAY = 86400
+
+GROUP_KEYS = ("day", "symbol", "magic")
+VALUES = ("profit", "commission", "swap", "fee", "volume", "deals")
+
+PNL_DEAL_FIELDS = DEAL_FIELDS.project(["time", "type", "symbol", "magic", "volume", "profit", "commission", "swap", "fee"])
+EXPOSURE_FIELDS = FieldSpec(["symbol", "type", "volume", "profit", "swap"])
+EXPOSURE_VALUES = ("long_volume", "short_volume", "net_volume", "profit", "swap", "positions")
+
+def _empty():
+    columns = {"day": np.empty(0, np.int64), "symbol": np.empty(0, object), "magic": np.empty(0, np.int64)}
+    columns.update({name: np.empty(0, np.int64 if name == "deals" else np.float64) for name in VALUES})
+    return columns
+
+def group_by(columns, keys, values=VALUES):
+    size = len(columns[values[0]])
+    if size == 0:
+        return {name: columns[name][:0] for name in keys + values}
+    if keys:
+        uniques, codes = zip(*(np.unique(columns[key], return_inverse=True) for key in keys))
+        dims = tuple(len(unique) for unique in uniques)
+        groups, inverse = np.unique(np.ravel_multi_index(codes, dims), return_inverse=True)
+        positions = np.unravel_index(groups, dims)
+        grouped = {key: unique[position] for key, unique, position in zip(keys, uniques, positions)}
+    else:
+        groups, inverse = np.zeros(1, np.int64), np.zeros(size, np.int64)
+        grouped = {}
+    for name in values:
+        summed = np.bincount(inverse, weights=columns[name], minlength=len(groups))
+        grouped[name] = summed.astype(np.int64) if columns[name].dtype == np.int64 else summed
+    return grouped
+
+def _concat(parts):
+    parts = [part for part in parts if len(part["deals"])]
+    if not parts:
+        return _empty()
+    return {name: np.concatenate([part[name] for part in parts]) for name in GROUP_KEYS + VALUES}
+
+def _aggregate_deals(deals):
+    deals = [deal for deal in deals if deal.type in (mt5.DEAL_TYPE_BUY, mt5.DEAL_TYPE_SELL)]
+    if not deals:
+        return _empty()
+    columns = to_arrays(deals, PNL_DEAL_FIELDS)
+    columns["day"] = columns["time"].astype(np.int64) // DAY * DAY
+    columns["symbol"] = columns["symbol"].astype(object)
+    columns["magic"] = columns["magic"].astype(np.int64)
+    for name in VALUES[:-1]:
+        columns[name] = columns[name].astype(np.float64)
+    columns["deals"] = np.ones(len(deals), np.int64)
+    return group_by(columns, GROUP_KEYS)
+
+def _split_days(columns):
+    days = {}
+    for day in np.unique(columns["day"]).tolist():
+        mask = columns["day"] == day
+        days[day] = {name: column[mask] for name, column in columns.items()}
+    return days
+
+class DailyPnl:
+    def __init__(self, close_delay):
+        self._close_delay = close_delay
+        self._days = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    def _runs(self, days):
+        run = []
+        for day in days:
+            if run and day != run[-1] + DAY:
+                yield run
+                run = []
+            run.append(day)
+        if run:
+            yield run
+
+    def _fetch(self, first_day, last_day):
+        deals = fetch_history_deals(from_msc(first_day * 1000), from_msc((last_day + DAY - 1) * 1000))
+        return _split_days(_aggregate_deals(deals))
+
+    def range(self, first_day, last_day):
+        days = list(range(first_day, last_day + 1, DAY))
+        closed_until = time.time() - self._close_delay
+        closed = [day for day in days if day + DAY <= closed_until]
+        with self._lock:
+            missing = [day for day in closed if day not in self._days]
+            self.reused += len(closed) - len(missing)
+
+        for run in self._runs(missing):
+            fetched = self._fetch(run[0], run[-1])
+            with self._lock:
+                for day in run:
+                    self._days[day] = fetched.get(day, _empty())
+                self.computed += len(run)
+
+        parts = []
+        with self._lock:
+            parts.extend(self._days[day] for day in closed)
+        open_days = [day for day in days if day + DAY > closed_until]
+        if open_days:
+            parts.extend(self._fetch(open_days[0], open_days[-1]).values())
+        return _concat(parts)
+
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"closed_days": len(self._days), "computed": self.computed, "reused": self.reused}
+
+daily_pnl = DailyPnl(config.ANALYTICS_CLOSE_DELAY)
+
+def exposure():
+    positions = mt5.positions_get()
+    if positions is None:
+        raise RuntimeError(f"Errore nella lettura delle posizioni aperte: {mt5.last_error()}")
+    order_book.load_positions(positions)
+
+    columns = to_arrays(positions, EXPOSURE_FIELDS)
+    volume = columns["volume"].astype(np.float64)
+    is_long = columns["type"] == mt5.POSITION_TYPE_BUY
+    columns["symbol"] = columns["symbol"].astype(object)
+    columns["long_volume"] = np.where(is_long, volume, 0.0)
+    columns["short_volume"] = np.where(is_long, 0.0, volume)
+    columns["net_volume"] = columns["long_volume"] - columns["short_volume"]
+    columns["profit"] = columns["profit"].astype(np.float64)
+    columns["swap"] = columns["swap"].astype(np.float64)
+    columns["positions"] = np.ones(len(volume), np.int64)
+    return group_by(columns, ("symbol",), EXPOSURE_VALUES)
+
+def _table(columns, names, fmt):
+    values = {}
+    for name in names:
+        column = columns[name]
+        if name == "day":
+            values[name] = [datetime.fromtimestamp(day, timezone.utc).strftime("%Y-%m-%d") for day in column.tolist()]
+        elif column.dtype == np.float64:
+            values[name] = np.round(column, 2).tolist()
+        else:
+            values[name] = column.tolist()
+    if fmt == COLUMNAR:
+        return {"fields": list(names), "columns": values}
+    rows = list(zip(*(values[name] for name in names)))
+    if fmt == ROWS:
+        return {"fields": list(names), "rows": [list(row) for row in rows]}
+    return [dict(zip(names, row)) for row in rows]
+
+def get_analytics(from_date, to_date, keys=GROUP_KEYS, fmt=RECORDS, with_exposure=True):
+    try:
+        first_day = int(from_date.replace(tzinfo=timezone.utc).timestamp()) // DAY * DAY
+        last_day = int(to_date.replace(tzinfo=timezone.utc).timestamp()) // DAY * DAY
+        if last_day < first_day:
+            return Result.error("to_date deve essere successiva a from_date", 400)
+
+        started = time.perf_counter()
+        deals = daily_pnl.range(first_day, last_day)
+        totals = _table(group_by(deals, ()), VALUES, COLUMNAR)["columns"]
+        payload = {
+            "group_by": list(keys),
+            "pnl": _table(group_by(deals, keys), keys + VALUES, fmt),
+            "totals": {name: column[0] if column else 0 for name, column in totals.items()},
+        }
+        if with_exposure:
+            payload["exposure"] = _table(exposure(), ("symbol",) + EXPOSURE_VALUES, fmt)
+        payload["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return Result.ok(payload)
+
+    except Exception as e:
+        logging.error("Errore nella funzione get_analytics: %s", e)
+        return Result.error(str(e), 500)
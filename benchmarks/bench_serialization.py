@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serialization import DEAL_FIELDS, to_arrays, to_columns, to_records, to_rows
+
+TradeDeal = namedtuple("TradeDeal", DEAL_FIELDS.attrs)
+
+SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "XAUUSD", "US500", "BTCUSD"]
+
+def synthetic_deals(count, seed=42):
+    rnd = random.Random(seed)
+    start = 1704067200
+    deals = []
+    for i in range(count):
+        t = start + i * 7
+        deals.append(TradeDeal(
+            ticket=100000 + i, order=200000 + i, time=t, time_msc=t * 1000 + rnd.randint(0, 999),
+            type=rnd.randint(0, 1), entry=rnd.randint(0, 1), magic=rnd.choice([0, 1001, 2002]),
+            position_id=300000 + i // 2, reason=3, volume=round(rnd.uniform(0.01, 5), 2),
+            price=round(rnd.uniform(1, 2000), 5), commission=round(-rnd.random(), 2), swap=0.0,
+            profit=round(rnd.uniform(-500, 500), 2), fee=0.0, symbol=rnd.choice(SYMBOLS),
+            comment="Ordine caricato da Server API", external_id="",
+        ))
+    return deals
+
+def legacy_records(deals):
+    orders_readable = []
+    for deal in deals:
+        orders_readable.append({
+            "ticket": deal.ticket,
+            "order": deal.order,
+            "time": deal.time,
+            "time_msc": deal.time_msc,
+            "type": deal.type,
+            "entry": deal.entry,
+            "magic": deal.magic,
+            "position_id": deal.position_id,
+            "reason": deal.reason,
+            "volume": deal.volume,
+            "price": deal.price,
+            "commission": deal.commission,
+            "swap": deal.swap,
+            "profit": deal.profit,
+            "fee": deal.fee,
+            "symbol": deal.symbol,
+            "comment": deal.comment,
+            "external_id": deal.external_id,
+        })
+    return orders_readable
+
+def measure(fn, deals, repeat):
+    build = encode = float("inf")
+    size = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        payload = fn(deals)
+        t1 = time.perf_counter()
+        body = json.dumps(payload)
+        t2 = time.perf_counter()
+        build = min(build, t1 - t0)
+        encode = min(encode, t2 - t1)
+        size = len(body)
+    return {"build_ms": round(build * 1000, 2), "encode_ms": round(encode * 1000, 2),
+            "total_ms": round((build + encode) * 1000, 2), "bytes": size}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serializzazione history_deals_get")
+    parser.add_argument("--deals", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    deals = synthetic_deals(args.deals)
+    cases = {
+        "legacy": legacy_records,
+        "records": lambda d: to_records(d, DEAL_FIELDS),
+        "rows": lambda d: to_rows(d, DEAL_FIELDS),
+        "columnar": lambda d: to_columns(d, DEAL_FIELDS),
+    }
+
+    t0 = time.perf_counter()
+    to_arrays(deals, DEAL_FIELDS)
+    arrays_ms = (time.perf_counter() - t0) * 1000
+
+    results = {name: measure(fn, deals, args.repeat) for name, fn in cases.items()}
+    baseline = results["legacy"]["total_ms"]
+    print(f"{args.deals} deals, migliore di {args.repeat} esecuzioni")
+    print(f"{'formato':<10}{'build ms':>12}{'encode ms':>12}{'totale ms':>12}{'bytes':>14}{'speedup':>10}")
+    for name, r in results.items():
+        print(f"{name:<10}{r['build_ms']:>12}{r['encode_ms']:>12}{r['total_ms']:>12}{r['bytes']:>14}"
+              f"{baseline / r['total_ms']:>9.2f}x")
+    print(f"to_arrays (solo NumPy, senza JSON): {arrays_ms:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = {
+    "active": 30,
+    "placed": 20,
+    "account": 20,
+    "history": 10,
+    "historyDeals": 10,
+    "order": 10,
+}
+
+# Lo scenario order esegue create, modify e cancel: ogni richiesta e misurata a parte.
+ORDER_STEPS = ("create", "modify", "cancel")
+
+def measured(names):
+    return [step for name in names for step in (ORDER_STEPS if name == "order" else (name,))]
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100.0 * len(values) + 0.5)) - 1))
+    return values[index]
+
+class LoadTest:
+    def __init__(self, app, history_days, seed):
+        self.app = app
+        self.history_days = history_days
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in measured(SCENARIOS)}
+        self.errors = {name: 0 for name in self.latencies}
+        self.rejected = {name: 0 for name in self.latencies}
+        self.statuses = {}
+
+    def record(self, name, started, response):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            self.statuses[response.status_code] = self.statuses.get(response.status_code, 0) + 1
+            body = response.get_json(silent=True) or {}
+            if response.status_code == 429:
+                self.rejected[name] += 1
+            elif response.status_code >= 400 or body.get("status") == "error" or body.get("success") is False:
+                self.errors[name] += 1
+        return response
+
+    def history_range(self):
+        to_day = time.time() - self.random.randint(0, 30) * 86400
+        from_day = to_day - self.history_days * 86400
+        fmt = "%d/%m/%Y"
+        return time.strftime(fmt, time.gmtime(from_day)), time.strftime(fmt, time.gmtime(to_day))
+
+    def run(self, name):
+        client = self.app.test_client()
+        started = time.perf_counter()
+        if name in ("active", "placed"):
+            return self.record(name, started, client.get(f"/orders?status={name}"))
+        if name == "account":
+            return self.record(name, started, client.get("/account"))
+        if name in ("history", "historyDeals"):
+            from_date, to_date = self.history_range()
+            return self.record(name, started, client.get(
+                f"/orders?status={name}&from_date={from_date}&to_date={to_date}"))
+
+        created = self.record("create", started, client.post("/orders", json={
+            "symbol": "EURUSD", "type": "buy_limit", "volume": 0.1, "price": 1.05}))
+        ticket = (created.get_json(silent=True) or {}).get("order_id")
+        if not ticket:
+            return created
+        started = time.perf_counter()
+        modified = self.record("modify", started, client.put("/orders", json={"ticket": ticket, "price": 1.04, "stop_loss": 1.03}))
+        started = time.perf_counter()
+        return self.record("cancel", started, client.delete("/orders", json={"ticket": ticket}))
+
+    def report(self, duration):
+        scenarios = {}
+        for name, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            scenarios[name] = {
+                "requests": len(latencies),
+                "errors": self.errors[name],
+                "rejected": self.rejected[name],
+                "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                "p90_ms": round(percentile(latencies, 90) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                "max_ms": round(max(latencies) * 1000, 2),
+            }
+        every = [value for latencies in self.latencies.values() for value in latencies]
+        requests = len(every)
+        return {
+            "requests": requests,
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(requests / duration, 1) if duration else 0.0,
+            "p50_ms": round(percentile(every, 50) * 1000, 2),
+            "p90_ms": round(percentile(every, 90) * 1000, 2),
+            "p99_ms": round(percentile(every, 99) * 1000, 2),
+            "errors": sum(self.errors.values()),
+            "rejected": sum(self.rejected.values()),
+            "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+            "scenarios": scenarios,
+        }
+
+def print_report(report, baseline=None):
+    print(f"{report['requests']} richieste in {report['duration_s']} s: {report['throughput_rps']} req/s, "
+          f"p50 {report['p50_ms']} ms, p90 {report['p90_ms']} ms, p99 {report['p99_ms']} ms, "
+          f"errori {report['errors']}, rifiutate 429 {report['rejected']}, status {report['statuses']}")
+    print(f"{'scenario':<14}{'richieste':>10}{'errori':>8}{'429':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          + (f"{'p99 base':>10}{'delta':>9}" if baseline else ""))
+    for name, r in report["scenarios"].items():
+        line = (f"{name:<14}{r['requests']:>10}{r['errors']:>8}{r['rejected']:>6}{r['p50_ms']:>10}{r['p90_ms']:>10}"
+                f"{r['p99_ms']:>10}{r['max_ms']:>10}")
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            delta = (r["p99_ms"] - base["p99_ms"]) / base["p99_ms"] * 100 if base["p99_ms"] else 0.0
+            line += f"{base['p99_ms']:>10}{delta:>8.1f}%"
+        print(line)
+    if baseline:
+        delta = (report["throughput_rps"] - baseline["throughput_rps"]) / baseline["throughput_rps"] * 100
+        print(f"throughput rispetto alla baseline: {baseline['throughput_rps']} -> {report['throughput_rps']} req/s "
+              f"({delta:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test dell'API con il terminale MT5 simulato (fake_mt5)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help="Scenari da eseguire separati da virgola: " + ", ".join(SCENARIOS))
+    parser.add_argument("--history-days", type=int, default=7)
+    parser.add_argument("--history-store", action="store_true",
+                        help="Usa lo store SQLite dello storico (file temporaneo) invece di interrogare il terminale")
+    parser.add_argument("--background", action="store_true",
+                        help="Avvia poller degli snapshot e broadcaster come in produzione")
+    parser.add_argument("--latency", type=float, help="Latenza simulata per chiamata MT5 in secondi")
+    parser.add_argument("--deals-per-day", type=int, help="Deals generati per giorno di storico")
+    parser.add_argument("--failure-rate", type=float, help="Frazione di order_send rifiutati")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Salva il report JSON in questo file")
+    parser.add_argument("--baseline", help="Report JSON di un'esecuzione precedente da confrontare")
+    args = parser.parse_args()
+
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Scenari non validi: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="apim-load-")
+    os.environ["MT5_MODULE"] = "fake_mt5"
+    os.environ["HISTORY_DB"] = os.path.join(workdir, "history.db") if args.history_store else ""
+    os.environ.setdefault("LOG_FILE", os.path.join(workdir, "trading_api.log"))
+
+    import fake_mt5
+    overrides = {"latency": args.latency, "deals_per_day": args.deals_per_day, "failure_rate": args.failure_rate,
+                 "seed": args.seed}
+    fake_mt5.configure(**{key: value for key, value in overrides.items() if value is not None})
+
+    from server import app, broadcaster, poller, session
+    if not session.start():
+        sys.exit(f"Impossibile avviare la sessione MT5 simulata: {session.last_error}")
+    if args.background:
+        poller.start()
+        broadcaster.start()
+
+    test = LoadTest(app, args.history_days, args.seed)
+    weights = [SCENARIOS[name] for name in names]
+    plan = test.random.choices(names, weights, k=args.requests)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(test.run, plan))
+    report = test.report(time.perf_counter() - started)
+    report["settings"] = {"concurrency": args.concurrency, "scenarios": names, "history_days": args.history_days,
+                          "history_store": args.history_store, "background": args.background,
+                          "fake_mt5": dict(fake_mt5.settings)}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report salvato in {args.output}")
+
+if __name__ == "__main__":
+    main()
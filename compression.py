@@ -0,0 +1,29 @@
+import config
+import gzip
+from flask import request
+
+# Il corpo compresso e una rappresentazione diversa: riceve un ETag distinto, altrimenti
+# una cache potrebbe rispondere 304 a un client con la versione nell'altra codifica.
+GZIP_ETAG_SUFFIX = "-gzip"
+
+def etag_variants(etag):
+    return etag, etag + GZIP_ETAG_SUFFIX
+
+def _compress(response):
+    if (config.GZIP_MIN_BYTES <= 0 or response.status_code < 200 or response.status_code in (204, 304)
+            or response.is_streamed or response.direct_passthrough or response.mimetype != "application/json"
+            or "Content-Encoding" in response.headers or not request.accept_encodings["gzip"]):
+        return response
+    body = response.get_data()
+    if len(body) < config.GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, config.GZIP_LEVEL, mtime=0))
+    response.headers["Content-Encoding"] = "gzip"
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX)
+    response.vary.add("Accept-Encoding")
+    return response
+
+def install(app):
+    app.after_request(_compress)
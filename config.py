@@ -0,0 +1,77 @@
+import os
+
+MT5_MODULE = os.environ.get("MT5_MODULE", "MetaTrader5")
+MT5_PATH = os.environ.get("MT5_PATH") or None
+
+MT5_HEALTH_INTERVAL = float(os.environ.get("MT5_HEALTH_INTERVAL", 1.0))
+MT5_RECONNECT_BACKOFF = float(os.environ.get("MT5_RECONNECT_BACKOFF", 0.5))
+MT5_RECONNECT_BACKOFF_MAX = float(os.environ.get("MT5_RECONNECT_BACKOFF_MAX", 30.0))
+MT5_STARTUP_ATTEMPTS = int(os.environ.get("MT5_STARTUP_ATTEMPTS", 5))
+
+MT5_CALL_TIMEOUT = float(os.environ.get("MT5_CALL_TIMEOUT", 30.0))
+
+LANE_ORDERS_LIMIT = int(os.environ.get("LANE_ORDERS_LIMIT", 0))
+LANE_SNAPSHOT_LIMIT = int(os.environ.get("LANE_SNAPSHOT_LIMIT", 16))
+LANE_HISTORY_LIMIT = int(os.environ.get("LANE_HISTORY_LIMIT", 2))
+LANE_RETRY_AFTER = int(os.environ.get("LANE_RETRY_AFTER", 1))
+
+HISTORY_WINDOW_HOURS = float(os.environ.get("HISTORY_WINDOW_HOURS", 24))
+
+HISTORY_DB = os.environ.get("HISTORY_DB", "history.db")
+HISTORY_STORE_SYNC_INTERVAL = float(os.environ.get("HISTORY_STORE_SYNC_INTERVAL", 2.0))
+HISTORY_STORE_ORDERS_OVERLAP = int(os.environ.get("HISTORY_STORE_ORDERS_OVERLAP", 86400))
+HISTORY_STORE_SETTLE = int(os.environ.get("HISTORY_STORE_SETTLE", 600))
+
+SYMBOL_CACHE_TTL = float(os.environ.get("SYMBOL_CACHE_TTL", 300.0))
+WARM_SYMBOLS = [s.strip() for s in os.environ.get("WARM_SYMBOLS", "").split(",") if s.strip()]
+
+ORDER_REQUOTE_RETRIES = int(os.environ.get("ORDER_REQUOTE_RETRIES", 2))
+
+ORDER_BOOK_MAX_AGE = float(os.environ.get("ORDER_BOOK_MAX_AGE", 5.0))
+
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", 1.0))
+SNAPSHOT_MAX_AGE = float(os.environ.get("SNAPSHOT_MAX_AGE", 5.0))
+
+PUSH_TICK_INTERVAL = float(os.environ.get("PUSH_TICK_INTERVAL", 0.25))
+PUSH_MAX_EVENTS = int(os.environ.get("PUSH_MAX_EVENTS", 256))
+PUSH_HEARTBEAT = float(os.environ.get("PUSH_HEARTBEAT", 15.0))
+
+ANALYTICS_CLOSE_DELAY = int(os.environ.get("ANALYTICS_CLOSE_DELAY", 3600))
+
+MARKET_DATA_CACHE_BYTES = int(os.environ.get("MARKET_DATA_CACHE_BYTES", 256 * 1024 * 1024))
+
+COALESCE_TTL_SNAPSHOT = float(os.environ.get("COALESCE_TTL_SNAPSHOT", 0.25))
+COALESCE_TTL_HISTORY = float(os.environ.get("COALESCE_TTL_HISTORY", 0.5))
+COALESCE_MAX_RESULTS = int(os.environ.get("COALESCE_MAX_RESULTS", 256))
+
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", 5000))
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 16))
+# Ogni flusso SSE/NDJSON occupa un thread del server per tutta la sua durata: il limite resta
+# sotto SERVER_THREADS perche /healthz, /readyz e gli ordini trovino sempre un thread libero.
+SERVER_MAX_STREAMS = min(int(os.environ.get("SERVER_MAX_STREAMS", SERVER_THREADS // 2)), SERVER_THREADS - 1)
+SERVER_KEEPALIVE = int(os.environ.get("SERVER_KEEPALIVE", 75))
+SERVER_DRAIN_TIMEOUT = float(os.environ.get("SERVER_DRAIN_TIMEOUT", 30.0))
+
+GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 5))
+JSON_ENCODER = os.environ.get("JSON_ENCODER", "auto")
+
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+
+LOG_FILE = os.environ.get("LOG_FILE", "trading_api.log")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", 5))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+LOG_RATE_WINDOW = float(os.environ.get("LOG_RATE_WINDOW", 10.0))
+LOG_RATE_BURST = int(os.environ.get("LOG_RATE_BURST", 20))
+
+GATEWAY_ACCOUNTS = os.environ.get("GATEWAY_ACCOUNTS", "accounts.json")
+GATEWAY_HOST = os.environ.get("GATEWAY_HOST", "0.0.0.0")
+GATEWAY_PORT = int(os.environ.get("GATEWAY_PORT", 5000))
+GATEWAY_LOGIN_HEADER = os.environ.get("GATEWAY_LOGIN_HEADER", "X-MT5-Login")
+GATEWAY_POOL_SIZE = int(os.environ.get("GATEWAY_POOL_SIZE", 8))
+GATEWAY_TIMEOUT = float(os.environ.get("GATEWAY_TIMEOUT", 60.0))
+GATEWAY_CHECK_INTERVAL = float(os.environ.get("GATEWAY_CHECK_INTERVAL", 1.0))
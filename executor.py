@@ -0,0 +1,152 @@
+import importlib
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import admission
+import config
+import metrics
+
+class CallTimeout(TimeoutError):
+    def __init__(self, name, running):
+        if running:
+            message = f"Timeout della chiamata MT5 {name}: la chiamata e in esecuzione sul terminale, esito sconosciuto"
+        else:
+            message = f"Timeout della chiamata MT5 {name}: chiamata annullata prima dell'esecuzione"
+        super().__init__(message)
+        self.name = name
+        self.running = running
+
+NO_ERROR = (1, "Success")
+
+class MT5Executor:
+    def __init__(self, name="mt5-executor", error_reader=None):
+        self._name = name
+        self._error_reader = error_reader
+        self._local = threading.local()
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            _, _, (fn, args, kwargs, future, enqueued) = self._queue.get()
+            started = time.perf_counter()
+            if not future.set_running_or_notify_cancel():
+                continue
+            name = getattr(fn, "__name__", "unknown")
+            result = None
+            try:
+                result, error = self._invoke(fn, args, kwargs)
+                future.set_result((result, error))
+                failed = False
+            except BaseException as e:
+                logging.exception(f"Errore nella chiamata MT5 {name}")
+                future.set_exception(e)
+                failed = True
+            finished = time.perf_counter()
+            metrics.record_mt5_call(name, started - enqueued, finished - started, result, failed)
+
+            with self._stats_lock:
+                wait = started - enqueued
+                self.completed += 1
+                self.failed += failed
+                self.wait_time_total += wait
+                self.wait_time_max = max(self.wait_time_max, wait)
+                self.run_time_total += finished - started
+
+    def _invoke(self, fn, args, kwargs):
+        # last_error() va letto subito dopo la chiamata fallita, prima che un'altra chiamata
+        # di un altro thread lo sovrascriva, e restituito insieme al risultato.
+        result = fn(*args, **kwargs)
+        if self._error_reader is not None and (result is None or result is False):
+            return result, self._error_reader()
+        return result, NO_ERROR
+
+    def last_error(self):
+        return getattr(self._local, "error", NO_ERROR)
+
+    def on_owner_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, priority, fn, *args, **kwargs):
+        self.start()
+        future = Future()
+        with self._stats_lock:
+            self.submitted += 1
+        self._queue.put((priority, next(self._sequence), (fn, args, kwargs, future, time.perf_counter())))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        if self.on_owner_thread():
+            result, self._local.error = self._invoke(fn, args, kwargs)
+            return result
+        future = self.submit(admission.current_priority(), fn, *args, **kwargs)
+        try:
+            result, self._local.error = future.result(timeout=config.MT5_CALL_TIMEOUT)
+            return result
+        except FutureTimeout:
+            # Una chiamata ancora in coda viene annullata (_run la salta): il client puo ripetere
+            # la richiesta senza duplicare l'ordine. Se e gia in esecuzione l'esito non e noto.
+            name = getattr(fn, "__name__", "unknown")
+            if future.cancel():
+                raise CallTimeout(name, False)
+            if future.done():
+                result, self._local.error = future.result()
+                return result
+            raise CallTimeout(name, True)
+
+    def stats(self):
+        with self._stats_lock:
+            completed = self.completed
+            return {
+                "queue_depth": self._queue.qsize(),
+                "submitted": self.submitted,
+                "completed": completed,
+                "failed": self.failed,
+                "wait_time_avg_ms": round(self.wait_time_total / completed * 1000, 3) if completed else 0.0,
+                "wait_time_max_ms": round(self.wait_time_max * 1000, 3),
+                "run_time_avg_ms": round(self.run_time_total / completed * 1000, 3) if completed else 0.0,
+            }
+
+class MT5Proxy:
+    def __init__(self, module, executor):
+        self._module = module
+        self._executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if name == "last_error":
+            value = self._executor.last_error
+        elif callable(attr):
+            executor = self._executor
+
+            def call(*args, **kwargs):
+                return executor.call(attr, *args, **kwargs)
+
+            call.__name__ = name
+            value = call
+        else:
+            value = attr
+        setattr(self, name, value)
+        return value
+
+_module = importlib.import_module(config.MT5_MODULE)
+executor = MT5Executor(error_reader=_module.last_error)
+mt5 = MT5Proxy(_module, executor)
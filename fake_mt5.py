@@ -0,0 +1,616 @@
+import math
+import numpy as np
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+ORDER_TYPE_BUY_LIMIT = 2
+ORDER_TYPE_SELL_LIMIT = 3
+ORDER_TYPE_BUY_STOP = 4
+ORDER_TYPE_SELL_STOP = 5
+
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+
+ORDER_TIME_GTC = 0
+
+ORDER_STATE_PLACED = 1
+ORDER_STATE_CANCELED = 2
+ORDER_STATE_FILLED = 4
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_PENDING = 5
+TRADE_ACTION_SLTP = 6
+TRADE_ACTION_MODIFY = 7
+TRADE_ACTION_REMOVE = 8
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_INVALID = 10013
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_INVALID_PRICE = 10015
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+TRADE_RETCODE_POSITION_CLOSED = 10036
+
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+
+TIMEFRAME_M1 = 1
+TIMEFRAME_M2 = 2
+TIMEFRAME_M3 = 3
+TIMEFRAME_M4 = 4
+TIMEFRAME_M5 = 5
+TIMEFRAME_M6 = 6
+TIMEFRAME_M10 = 10
+TIMEFRAME_M12 = 12
+TIMEFRAME_M15 = 15
+TIMEFRAME_M20 = 20
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H2 = 16386
+TIMEFRAME_H3 = 16387
+TIMEFRAME_H4 = 16388
+TIMEFRAME_H6 = 16390
+TIMEFRAME_H8 = 16392
+TIMEFRAME_H12 = 16396
+TIMEFRAME_D1 = 16408
+TIMEFRAME_W1 = 32769
+TIMEFRAME_MN1 = 49153
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+RES_S_OK = 1
+RES_E_FAIL = -1
+RES_E_NOT_FOUND = -4
+RES_E_INTERNAL_FAIL_TIMEOUT = -10005
+
+AccountInfo = namedtuple("AccountInfo", [
+    "login", "trade_mode", "leverage", "limit_orders", "margin_so_mode", "trade_allowed", "trade_expert",
+    "margin_mode", "currency_digits", "fifo_close", "balance", "credit", "profit", "equity", "margin",
+    "margin_free", "margin_level", "margin_so_call", "margin_so_so", "margin_initial", "margin_maintenance",
+    "assets", "liabilities", "commission_blocked", "name", "server", "currency", "company",
+])
+TerminalInfo = namedtuple("TerminalInfo", ["connected", "trade_allowed", "ping_last", "name", "company"])
+SymbolInfo = namedtuple("SymbolInfo", [
+    "name", "visible", "select", "digits", "spread", "point", "trade_stops_level", "trade_freeze_level",
+    "filling_mode", "volume_min", "volume_max", "volume_step", "bid", "ask", "currency_base", "currency_profit",
+])
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+TradePosition = namedtuple("TradePosition", [
+    "ticket", "time", "time_msc", "time_update", "time_update_msc", "type", "magic", "identifier", "reason",
+    "volume", "price_open", "sl", "tp", "price_current", "swap", "profit", "symbol", "comment", "external_id",
+])
+TradeOrder = namedtuple("TradeOrder", [
+    "ticket", "time_setup", "time_setup_msc", "time_done", "time_done_msc", "time_expiration", "type", "type_time",
+    "type_filling", "state", "magic", "position_id", "position_by_id", "reason", "volume_initial", "volume_current",
+    "price_open", "sl", "tp", "price_current", "price_stoplimit", "symbol", "comment", "external_id",
+])
+TradeDeal = namedtuple("TradeDeal", [
+    "ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason", "volume", "price",
+    "commission", "swap", "profit", "fee", "symbol", "comment", "external_id",
+])
+OrderSendResult = namedtuple("OrderSendResult", [
+    "retcode", "deal", "order", "volume", "price", "bid", "ask", "comment", "request_id", "retcode_external",
+    "request",
+])
+
+SYMBOLS = {
+    "EURUSD": (1.08500, 5, 3),
+    "GBPUSD": (1.26500, 5, 3),
+    "USDJPY": (150.250, 3, 3),
+    "XAUUSD": (2350.00, 2, 1),
+    "US500": (5200.0, 1, 2),
+    "BTCUSD": (65000.0, 2, 1),
+}
+
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60, TIMEFRAME_M2: 120, TIMEFRAME_M3: 180, TIMEFRAME_M4: 240, TIMEFRAME_M5: 300,
+    TIMEFRAME_M6: 360, TIMEFRAME_M10: 600, TIMEFRAME_M12: 720, TIMEFRAME_M15: 900, TIMEFRAME_M20: 1200,
+    TIMEFRAME_M30: 1800, TIMEFRAME_H1: 3600, TIMEFRAME_H2: 7200, TIMEFRAME_H3: 10800, TIMEFRAME_H4: 14400,
+    TIMEFRAME_H6: 21600, TIMEFRAME_H8: 28800, TIMEFRAME_H12: 43200, TIMEFRAME_D1: 86400, TIMEFRAME_W1: 604800,
+    TIMEFRAME_MN1: 2592000,
+}
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+TICKS_DTYPE = np.dtype([
+    ("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<u8"),
+    ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8"),
+])
+
+SYMBOL_FILLING = {"US500": SYMBOL_FILLING_FOK, "BTCUSD": SYMBOL_FILLING_IOC}
+
+HISTORY_EPOCH = int(datetime(2020, 1, 1, tzinfo=timezone.utc).timestamp())
+
+def _env(name, default, cast):
+    return cast(os.environ.get(f"FAKE_MT5_{name}", default))
+
+settings = {
+    "positions": _env("POSITIONS", 50, int),
+    "orders": _env("ORDERS", 50, int),
+    "deals_per_day": _env("DEALS_PER_DAY", 500, int),
+    "latency": _env("LATENCY", 0.0005, float),
+    "latency_per_row": _env("LATENCY_PER_ROW", 0.000001, float),
+    "failure_rate": _env("FAILURE_RATE", 0.0, float),
+    "requote_rate": _env("REQUOTE_RATE", 0.0, float),
+    "disconnect_rate": _env("DISCONNECT_RATE", 0.0, float),
+    "ticks_per_minute": _env("TICKS_PER_MINUTE", 60, int),
+    "seed": _env("SEED", 7, int),
+}
+
+class FakeTerminal:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.random = random.Random(settings["seed"])
+            self.connected = False
+            self.login = 5000001
+            self.server = "Fake-Demo"
+            self.error = (RES_S_OK, "Success")
+            self.next_ticket = 10_000_000
+            self.positions = {}
+            self.orders = {}
+            self.selected = set(SYMBOLS)
+            now = time.time()
+            for _ in range(settings["positions"]):
+                self._open_position(self.random.choice(list(SYMBOLS)), self.random.randint(0, 1),
+                                    round(self.random.uniform(0.01, 2.0), 2), now - self.random.uniform(60, 86400))
+            for _ in range(settings["orders"]):
+                symbol = self.random.choice(list(SYMBOLS))
+                price = self.price(symbol, now)[0] * self.random.uniform(0.97, 1.03)
+                self._place_order(symbol, self.random.randint(2, 5), round(self.random.uniform(0.01, 2.0), 2),
+                                  round(price, SYMBOLS[symbol][1]), 0.0, 0.0, 0, now - self.random.uniform(60, 86400))
+
+    def ticket(self):
+        self.next_ticket += 1
+        return self.next_ticket
+
+    def price(self, symbol, at):
+        base, digits, spread = SYMBOLS[symbol]
+        mid = base * (1 + 0.01 * math.sin(at / 3600.0) + 0.0005 * math.sin(at / 7.0))
+        point = 10 ** -digits
+        bid = round(mid, digits)
+        return bid, round(bid + spread * point, digits)
+
+    def _open_position(self, symbol, side, volume, at, magic=0, comment=""):
+        bid, ask = self.price(symbol, at)
+        ticket = self.ticket()
+        price = ask if side == POSITION_TYPE_BUY else bid
+        self.positions[ticket] = TradePosition(
+            ticket, int(at), int(at * 1000), int(at), int(at * 1000), side, magic, ticket, 3, volume, price,
+            0.0, 0.0, price, 0.0, 0.0, symbol, comment, "")
+        return ticket
+
+    def _place_order(self, symbol, order_type, volume, price, sl, tp, magic, at, comment=""):
+        ticket = self.ticket()
+        self.orders[ticket] = TradeOrder(
+            ticket, int(at), int(at * 1000), 0, 0, 0, order_type, ORDER_TIME_GTC, ORDER_FILLING_RETURN,
+            ORDER_STATE_PLACED, magic, 0, 0, 3, volume, volume, price, sl or 0.0, tp or 0.0, price, 0.0, symbol,
+            comment, "")
+        return ticket
+
+    def refresh_position(self, position, at):
+        bid, ask = self.price(position.symbol, at)
+        current = bid if position.type == POSITION_TYPE_BUY else ask
+        direction = 1 if position.type == POSITION_TYPE_BUY else -1
+        profit = round((current - position.price_open) * direction * position.volume * 100000, 2)
+        return position._replace(price_current=current, profit=profit)
+
+terminal = FakeTerminal()
+
+def configure(**kwargs):
+    unknown = set(kwargs) - set(settings)
+    if unknown:
+        raise ValueError(f"Parametri non validi: {', '.join(sorted(unknown))}")
+    settings.update(kwargs)
+    terminal.reset()
+
+def _simulate(rows=0):
+    delay = settings["latency"] + settings["latency_per_row"] * rows
+    if delay > 0:
+        time.sleep(delay)
+
+def _connected():
+    if not terminal.connected:
+        terminal.error = (RES_E_FAIL, "Terminal not initialized")
+        return False
+    if settings["disconnect_rate"] and terminal.random.random() < settings["disconnect_rate"]:
+        terminal.connected = False
+        terminal.error = (RES_E_INTERNAL_FAIL_TIMEOUT, "IPC timeout")
+        return False
+    terminal.error = (RES_S_OK, "Success")
+    return True
+
+def _match_group(symbol, group):
+    if not group:
+        return True
+    included = False
+    for pattern in group.split(","):
+        pattern = pattern.strip()
+        if pattern.startswith("!"):
+            if fnmatchcase(symbol, pattern[1:]):
+                return False
+        elif fnmatchcase(symbol, pattern):
+            included = True
+    return included
+
+def _ts(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return int(value)
+
+def initialize(path=None, login=None, password=None, server=None, timeout=None, portable=False):
+    _simulate()
+    with terminal.lock:
+        if login is not None:
+            if not password:
+                terminal.connected = False
+                terminal.error = (RES_E_FAIL, "Authorization failed")
+                return False
+            terminal.login = int(login)
+            terminal.server = server or terminal.server
+        terminal.connected = True
+        terminal.error = (RES_S_OK, "Success")
+        return True
+
+def login(login, password=None, server=None, timeout=None):
+    return initialize(login=login, password=password, server=server)
+
+def shutdown():
+    with terminal.lock:
+        terminal.connected = False
+    return None
+
+def last_error():
+    return terminal.error
+
+def version():
+    return (500, 4687, "17 Oct 2026")
+
+def terminal_info():
+    _simulate()
+    if not _connected():
+        return None
+    return TerminalInfo(True, True, 1200, "Fake MetaTrader 5", "APIM")
+
+def account_info():
+    _simulate()
+    with terminal.lock:
+        if not _connected():
+            return None
+        now = time.time()
+        profit = round(sum(terminal.refresh_position(p, now).profit for p in terminal.positions.values()), 2)
+        margin = round(sum(p.volume * 1000 for p in terminal.positions.values()), 2)
+        balance = 100000.0
+        equity = round(balance + profit, 2)
+        return AccountInfo(
+            terminal.login, 0, 100, 200, 0, True, True, 2, 2, False, balance, 0.0, profit, equity, margin,
+            round(equity - margin, 2), round(equity / margin * 100, 2) if margin else 0.0, 50.0, 30.0, 0.0, 0.0,
+            0.0, 0.0, 0.0, "Fake Account", terminal.server, "USD", "APIM Fake Broker")
+
+def symbols_get(group=None):
+    _simulate()
+    if not _connected():
+        return None
+    return tuple(symbol_info(s) for s in SYMBOLS if _match_group(s, group))
+
+def symbol_info(symbol):
+    _simulate()
+    with terminal.lock:
+        if not _connected():
+            return None
+        if symbol not in SYMBOLS:
+            terminal.error = (RES_E_NOT_FOUND, f"Symbol {symbol} not found")
+            return None
+        base, digits, spread = SYMBOLS[symbol]
+        bid, ask = terminal.price(symbol, time.time())
+        return SymbolInfo(
+            symbol, symbol in terminal.selected, symbol in terminal.selected, digits, spread, 10 ** -digits, 10, 5,
+            SYMBOL_FILLING.get(symbol, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC), 0.01, 100.0, 0.01, bid, ask, symbol[:3], symbol[3:] or "USD")
+
+def symbol_select(symbol, enable=True):
+    _simulate()
+    with terminal.lock:
+        if not _connected() or symbol not in SYMBOLS:
+            return False
+        if enable:
+            terminal.selected.add(symbol)
+        else:
+            terminal.selected.discard(symbol)
+        return True
+
+def symbol_info_tick(symbol):
+    _simulate()
+    if not _connected() or symbol not in SYMBOLS:
+        return None
+    now = time.time()
+    bid, ask = terminal.price(symbol, now)
+    return Tick(int(now), bid, ask, 0.0, 0, int(now * 1000), 6, 0.0)
+
+def positions_get(symbol=None, group=None, ticket=None):
+    with terminal.lock:
+        if not _connected():
+            _simulate()
+            return None
+        now = time.time()
+        rows = tuple(
+            terminal.refresh_position(p, now) for p in terminal.positions.values()
+            if (ticket is None or p.ticket == ticket) and (symbol is None or p.symbol == symbol)
+            and _match_group(p.symbol, group)
+        )
+    _simulate(len(rows))
+    return rows
+
+def positions_total():
+    return len(terminal.positions)
+
+def orders_get(symbol=None, group=None, ticket=None):
+    with terminal.lock:
+        if not _connected():
+            _simulate()
+            return None
+        rows = tuple(
+            o for o in terminal.orders.values()
+            if (ticket is None or o.ticket == ticket) and (symbol is None or o.symbol == symbol)
+            and _match_group(o.symbol, group)
+        )
+    _simulate(len(rows))
+    return rows
+
+def orders_total():
+    return len(terminal.orders)
+
+def _history_indexes(date_from, date_to):
+    per_day = settings["deals_per_day"]
+    if per_day <= 0:
+        return range(0)
+    interval = 86400.0 / per_day
+    start = max(0, math.ceil((_ts(date_from) - HISTORY_EPOCH) / interval))
+    stop = min(math.floor((min(_ts(date_to), time.time()) - HISTORY_EPOCH) / interval), 10 ** 9)
+    return range(start, stop + 1) if stop >= start else range(0)
+
+def _history_deal(index):
+    interval = 86400.0 / settings["deals_per_day"]
+    rnd = random.Random(index * 7919 + settings["seed"])
+    at = HISTORY_EPOCH + index * interval
+    symbol = rnd.choice(list(SYMBOLS))
+    base, digits, _ = SYMBOLS[symbol]
+    entry = index % 2
+    return TradeDeal(
+        ticket=1_000_000 + index, order=2_000_000 + index, time=int(at), time_msc=int(at * 1000),
+        type=rnd.randint(0, 1), entry=entry, magic=rnd.choice([0, 1001, 2002]), position_id=3_000_000 + index // 2,
+        reason=3, volume=round(rnd.uniform(0.01, 2.0), 2), price=round(base * rnd.uniform(0.95, 1.05), digits),
+        commission=round(-rnd.uniform(0, 5), 2), swap=round(-rnd.uniform(0, 1), 2) if entry else 0.0,
+        profit=round(rnd.uniform(-300, 300), 2) if entry else 0.0, fee=0.0, symbol=symbol, comment="",
+        external_id="")
+
+def _history_order(index):
+    deal = _history_deal(index)
+    return TradeOrder(
+        deal.order, deal.time, deal.time_msc, deal.time, deal.time_msc, 0, deal.type, ORDER_TIME_GTC,
+        ORDER_FILLING_IOC, ORDER_STATE_FILLED, deal.magic, deal.position_id, 0, 3, deal.volume, 0.0, deal.price,
+        0.0, 0.0, deal.price, 0.0, deal.symbol, deal.comment, "")
+
+def _history(build, date_from, date_to, group, ticket, position, ticket_field):
+    if not _connected():
+        _simulate()
+        return None
+    if ticket is not None or position is not None:
+        latest = _history_indexes(HISTORY_EPOCH, time.time())
+        if ticket is not None:
+            indexes = [ticket - 2_000_000]
+        else:
+            indexes = [2 * (position - 3_000_000), 2 * (position - 3_000_000) + 1]
+        indexes = [index for index in indexes if index in latest]
+    elif date_from is None:
+        terminal.error = (RES_E_FAIL, "Invalid arguments")
+        return None
+    else:
+        indexes = _history_indexes(date_from, date_to)
+    rows = []
+    for index in indexes:
+        row = build(index)
+        if ticket is not None and getattr(row, ticket_field) != ticket:
+            continue
+        if position is not None and row.position_id != position:
+            continue
+        if not _match_group(row.symbol, group):
+            continue
+        rows.append(row)
+    _simulate(len(rows))
+    return tuple(rows)
+
+def history_deals_get(date_from=None, date_to=None, group=None, ticket=None, position=None):
+    return _history(_history_deal, date_from, date_to, group, ticket, position, "order")
+
+def history_orders_get(date_from=None, date_to=None, group=None, ticket=None, position=None):
+    return _history(_history_order, date_from, date_to, group, ticket, position, "ticket")
+
+def history_deals_total(date_from, date_to):
+    return len(_history_indexes(date_from, date_to))
+
+def history_orders_total(date_from, date_to):
+    return len(_history_indexes(date_from, date_to))
+
+def _result(retcode, request, order=0, deal=0, price=0.0, comment="Request executed"):
+    tick = symbol_info_tick(request.get("symbol")) if request.get("symbol") in SYMBOLS else None
+    return OrderSendResult(
+        retcode, deal, order, request.get("volume", 0.0), price, tick.bid if tick else 0.0, tick.ask if tick else 0.0,
+        comment, 0, 0, request)
+
+def order_send(request):
+    _simulate()
+    with terminal.lock:
+        if not _connected():
+            return None
+        if settings["failure_rate"] and terminal.random.random() < settings["failure_rate"]:
+            return _result(TRADE_RETCODE_REJECT, request, comment="Request rejected")
+
+        action = request.get("action")
+        now = time.time()
+
+        if action == TRADE_ACTION_DEAL:
+            symbol = request.get("symbol")
+            if symbol not in SYMBOLS:
+                return _result(TRADE_RETCODE_INVALID, request, comment="Invalid request")
+            filling = SYMBOL_FILLING.get(symbol, SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC)
+            allowed = {ORDER_FILLING_FOK: filling & SYMBOL_FILLING_FOK, ORDER_FILLING_IOC: filling & SYMBOL_FILLING_IOC}
+            if not allowed.get(request.get("type_filling", ORDER_FILLING_FOK)):
+                return _result(TRADE_RETCODE_INVALID_FILL, request, comment="Unsupported filling mode")
+            if settings["requote_rate"] and terminal.random.random() < settings["requote_rate"]:
+                return _result(TRADE_RETCODE_REQUOTE, request, comment="Requote")
+            bid, ask = terminal.price(symbol, now)
+            side = request.get("type")
+            position = request.get("position")
+            if position:
+                existing = terminal.positions.get(position)
+                if existing is None:
+                    return _result(TRADE_RETCODE_POSITION_CLOSED, request, comment="Position doesn't exist")
+                del terminal.positions[position]
+                return _result(TRADE_RETCODE_DONE, request, terminal.ticket(), terminal.ticket(),
+                               bid if side == ORDER_TYPE_SELL else ask)
+            ticket = terminal._open_position(symbol, side, request.get("volume", 0.0), now, request.get("magic", 0),
+                                             request.get("comment", ""))
+            return _result(TRADE_RETCODE_DONE, request, ticket, terminal.ticket(),
+                           ask if side == ORDER_TYPE_BUY else bid)
+
+        if action == TRADE_ACTION_PENDING:
+            symbol = request.get("symbol")
+            if symbol not in SYMBOLS or not request.get("price"):
+                return _result(TRADE_RETCODE_INVALID_PRICE, request, comment="Invalid price")
+            ticket = terminal._place_order(symbol, request.get("type"), request.get("volume", 0.0), request["price"],
+                                           request.get("sl"), request.get("tp"), request.get("magic", 0), now,
+                                           request.get("comment", ""))
+            return _result(TRADE_RETCODE_DONE, request, ticket)
+
+        if action == TRADE_ACTION_MODIFY:
+            order = terminal.orders.get(request.get("order"))
+            if order is None:
+                return _result(TRADE_RETCODE_INVALID, request, comment="Invalid request")
+            terminal.orders[order.ticket] = order._replace(
+                price_open=request.get("price", order.price_open), sl=request.get("sl") or 0.0,
+                tp=request.get("tp") or 0.0)
+            return _result(TRADE_RETCODE_DONE, request, order.ticket)
+
+        if action == TRADE_ACTION_REMOVE:
+            order = terminal.orders.pop(request.get("order"), None)
+            if order is None:
+                return _result(TRADE_RETCODE_INVALID, request, comment="Invalid request")
+            return _result(TRADE_RETCODE_DONE, request, order.ticket)
+
+        if action == TRADE_ACTION_SLTP:
+            position = terminal.positions.get(request.get("position"))
+            if position is None:
+                return _result(TRADE_RETCODE_POSITION_CLOSED, request, comment="Position doesn't exist")
+            terminal.positions[position.ticket] = position._replace(sl=request.get("sl") or 0.0,
+                                                                   tp=request.get("tp") or 0.0)
+            return _result(TRADE_RETCODE_DONE, request)
+
+        return _result(TRADE_RETCODE_INVALID, request, comment="Invalid request")
+
+def _mid(symbol, at):
+    base, digits, _ = SYMBOLS[symbol]
+    return np.round(base * (1 + 0.01 * np.sin(at / 3600.0) + 0.0005 * np.sin(at / 7.0)), digits)
+
+def _rates(symbol, timeframe, start):
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    start = np.asarray(start, dtype=np.int64)
+    rates = np.zeros(len(start), dtype=RATES_DTYPE)
+    samples = np.stack([_mid(symbol, start + seconds * k / 8.0) for k in range(9)])
+    rates["time"] = start
+    rates["open"] = samples[0]
+    rates["close"] = samples[-1]
+    rates["high"] = samples.max(axis=0)
+    rates["low"] = samples.min(axis=0)
+    rates["tick_volume"] = max(1, settings["ticks_per_minute"] * seconds // 60)
+    rates["spread"] = SYMBOLS[symbol][2]
+    return rates
+
+def _market_data(symbol):
+    if not _connected():
+        _simulate()
+        return False
+    if symbol not in SYMBOLS:
+        terminal.error = (RES_E_FAIL, "Invalid params")
+        _simulate()
+        return False
+    return True
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    if not _market_data(symbol):
+        return None
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    end = min(_ts(date_to), int(time.time()))
+    first = -(-_ts(date_from) // seconds) * seconds
+    rates = _rates(symbol, timeframe, np.arange(first, end + 1, seconds))
+    _simulate(len(rates))
+    return rates
+
+def copy_rates_from(symbol, timeframe, date_from, count):
+    if not _market_data(symbol):
+        return None
+    seconds = TIMEFRAME_SECONDS[timeframe]
+    last = min(_ts(date_from), int(time.time())) // seconds * seconds
+    rates = _rates(symbol, timeframe, np.arange(last - (count - 1) * seconds, last + 1, seconds))
+    _simulate(len(rates))
+    return rates
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    seconds = TIMEFRAME_SECONDS.get(timeframe, 60)
+    return copy_rates_from(symbol, timeframe, int(time.time()) - start_pos * seconds, count)
+
+def _ticks(symbol, start_msc, end_msc):
+    step = max(1, 60000 // max(1, settings["ticks_per_minute"]))
+    first = -(-start_msc // step) * step
+    time_msc = np.arange(first, end_msc + 1, step, dtype=np.int64)
+    _, digits, spread = SYMBOLS[symbol]
+    ticks = np.zeros(len(time_msc), dtype=TICKS_DTYPE)
+    ticks["time_msc"] = time_msc
+    ticks["time"] = time_msc // 1000
+    ticks["bid"] = _mid(symbol, time_msc / 1000.0)
+    ticks["ask"] = np.round(ticks["bid"] + spread * 10.0 ** -digits, digits)
+    ticks["flags"] = 6
+    return ticks
+
+def copy_ticks_range(symbol, date_from, date_to, flags=COPY_TICKS_ALL):
+    if not _market_data(symbol):
+        return None
+    ticks = _ticks(symbol, _ts(date_from) * 1000, min(_ts(date_to), int(time.time())) * 1000)
+    _simulate(len(ticks))
+    return ticks
+
+def copy_ticks_from(symbol, date_from, count, flags=COPY_TICKS_ALL):
+    if not _market_data(symbol):
+        return None
+    step = max(1, 60000 // max(1, settings["ticks_per_minute"]))
+    start = _ts(date_from) * 1000
+    ticks = _ticks(symbol, start, min(start + (count - 1) * step, int(time.time() * 1000)))
+    _simulate(len(ticks))
+    return ticks
@@ -0,0 +1,314 @@
+import config
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from flask import Flask, Response, jsonify, request
+from logs import setup_logging
+from serve import serve
+from multiprocessing.connection import Client, Listener
+
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "upgrade", "te", "trailer"}
+
+class WorkerUnavailable(Exception):
+    def __init__(self, login, message):
+        super().__init__(message)
+        self.login = login
+
+def _suffixed(path, login):
+    base, ext = os.path.splitext(path)
+    return f"{base}-{login}{ext}"
+
+def _worker_env(account):
+    login = int(account["login"])
+    env = {"LOG_FILE": _suffixed(config.LOG_FILE, login)}
+    if config.HISTORY_DB:
+        env["HISTORY_DB"] = _suffixed(config.HISTORY_DB, login)
+    if account.get("path"):
+        env["MT5_PATH"] = account["path"]
+    env.update({key: str(value) for key, value in account.get("env", {}).items()})
+    return env
+
+def _serve_connection(app, conn):
+    from werkzeug.test import EnvironBuilder
+    try:
+        while True:
+            try:
+                method, path, query, headers, body, remote_addr = conn.recv()
+            except EOFError:
+                return
+            environ = EnvironBuilder(path=path, method=method, query_string=query, headers=headers, data=body,
+                                     environ_base={"REMOTE_ADDR": remote_addr}).get_environ()
+            started = []
+
+            def start_response(status, response_headers, exc_info=None):
+                started[:] = [int(status.split(" ", 1)[0]), response_headers]
+                return lambda data: None
+
+            iterable = app(environ, start_response)
+            try:
+                conn.send(tuple(started))
+                for chunk in iterable:
+                    if chunk:
+                        conn.send_bytes(chunk)
+                conn.send_bytes(b"")
+            finally:
+                close = getattr(iterable, "close", None)
+                if close is not None:
+                    close()
+    except (OSError, EOFError):
+        pass
+    except Exception:
+        logging.exception("Errore nella gestione di una richiesta inoltrata dal gateway")
+    finally:
+        conn.close()
+
+def _worker_main(account, ready, authkey):
+    # Con lo start method spawn il processo figlio ha gia importato config (da gateway):
+    # va riletto dopo aver impostato l'ambiente del conto.
+    os.environ.update(_worker_env(account))
+    importlib.reload(config)
+
+    from server import app, start_services
+    login = int(account["login"])
+    logging.info(f"Worker gateway avviato per il conto {login} (pid {os.getpid()})")
+    start_services(login, account.get("password"), account.get("server"))
+
+    listener = Listener(authkey=authkey)
+    ready.send(listener.address)
+    ready.close()
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_serve_connection, args=(app, conn), name=f"gateway-conn-{login}", daemon=True).start()
+
+class Worker:
+    def __init__(self, account, authkey):
+        self.account = account
+        self.login = int(account["login"])
+        self._authkey = authkey
+        self._lock = threading.Lock()
+        self._idle = []
+        self._ready = None
+        self.process = None
+        self.address = None
+        self.generation = 0
+        self.started = None
+        self.restarts = 0
+        self.backoff = config.MT5_RECONNECT_BACKOFF
+        self.next_restart = 0.0
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        ready, child = context.Pipe(duplex=False)
+        with self._lock:
+            self._discard()
+            self.address = None
+            self.generation += 1
+            self._ready = ready
+            self.process = context.Process(target=_worker_main, args=(self.account, child, self._authkey),
+                                           name=f"mt5-worker-{self.login}", daemon=True)
+            self.process.start()
+            self.started = time.monotonic()
+        child.close()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def ready(self):
+        with self._lock:
+            if self.address is None and self._ready is not None:
+                try:
+                    if self._ready.poll():
+                        self.address = self._ready.recv()
+                        self._ready.close()
+                        self._ready = None
+                        self.backoff = config.MT5_RECONNECT_BACKOFF
+                        logging.info(f"Worker del conto {self.login} pronto su {self.address}")
+                except (OSError, EOFError):
+                    self._ready = None
+            return self.address is not None and self.alive()
+
+    def acquire(self):
+        if not self.ready():
+            raise WorkerUnavailable(self.login, f"Worker del conto {self.login} non disponibile")
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), self.generation
+            address, generation = self.address, self.generation
+        try:
+            return Client(address, authkey=self._authkey), generation
+        except OSError as e:
+            raise WorkerUnavailable(self.login, f"Connessione al worker del conto {self.login} fallita: {e}")
+
+    def release(self, conn, generation):
+        with self._lock:
+            if generation == self.generation and len(self._idle) < config.GATEWAY_POOL_SIZE:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _discard(self):
+        for conn in self._idle:
+            conn.close()
+        self._idle = []
+
+    def stop(self):
+        with self._lock:
+            self._discard()
+            if self.process is not None and self.process.is_alive():
+                self.process.terminate()
+                self.process.join(5)
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "login": self.login,
+            "server": self.account.get("server"),
+            "pid": self.process.pid if self.process is not None else None,
+            "alive": self.alive(),
+            "ready": self.address is not None,
+            "uptime": round(time.monotonic() - self.started, 1) if self.started is not None and self.alive() else 0,
+            "restarts": self.restarts,
+            "idle_connections": idle,
+        }
+
+class Gateway:
+    def __init__(self):
+        self.workers = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def load(self, path):
+        with open(path, encoding="utf-8") as f:
+            accounts = json.load(f)
+        authkey = secrets.token_bytes(32)
+        self.workers = {int(account["login"]): Worker(account, authkey) for account in accounts}
+
+    def start(self, path=None):
+        self.load(path or config.GATEWAY_ACCOUNTS)
+        if not self.workers:
+            raise ValueError(f"Nessun conto configurato in {path or config.GATEWAY_ACCOUNTS}")
+        for worker in self.workers.values():
+            worker.start()
+        self._thread = threading.Thread(target=self._supervise, name="gateway-supervisor", daemon=True)
+        self._thread.start()
+
+    def _supervise(self):
+        while not self._stop.wait(config.GATEWAY_CHECK_INTERVAL):
+            for worker in self.workers.values():
+                if worker.alive():
+                    worker.ready()
+                    continue
+                now = time.monotonic()
+                if now < worker.next_restart:
+                    continue
+                logging.warning(f"Worker del conto {worker.login} terminato (exit code {worker.process.exitcode}), riavvio")
+                worker.restarts += 1
+                worker.next_restart = now + worker.backoff
+                worker.backoff = min(worker.backoff * 2, config.MT5_RECONNECT_BACKOFF_MAX)
+                worker.start()
+
+    def stop(self):
+        self._stop.set()
+        for worker in self.workers.values():
+            worker.stop()
+
+    def route(self, login):
+        if login is None:
+            if len(self.workers) == 1:
+                return next(iter(self.workers.values()))
+            return None
+        return self.workers.get(login)
+
+    def forward(self, worker, path):
+        conn, generation = worker.acquire()
+        try:
+            conn.send((request.method, path, request.query_string.decode("latin-1"), list(request.headers.items()), request.get_data(),
+                       request.remote_addr))
+            if not conn.poll(config.GATEWAY_TIMEOUT):
+                raise WorkerUnavailable(worker.login, f"Timeout del worker del conto {worker.login}")
+            status, headers = conn.recv()
+        except WorkerUnavailable:
+            conn.close()
+            raise
+        except (OSError, EOFError) as e:
+            conn.close()
+            raise WorkerUnavailable(worker.login, f"Worker del conto {worker.login} non raggiungibile: {e}")
+
+        def body():
+            complete = False
+            try:
+                while True:
+                    chunk = conn.recv_bytes()
+                    if not chunk:
+                        complete = True
+                        return
+                    yield chunk
+            except (OSError, EOFError) as e:
+                logging.warning(f"Risposta del worker del conto {worker.login} interrotta: {e}")
+            finally:
+                if complete:
+                    worker.release(conn, generation)
+                else:
+                    conn.close()
+
+        headers = [(name, value) for name, value in headers if name.lower() not in HOP_BY_HOP]
+        return Response(body(), status=status, headers=headers)
+
+    def stats(self):
+        return [worker.stats() for worker in self.workers.values()]
+
+gateway = Gateway()
+
+app = Flask(__name__)
+
+def _error(message, status, headers=None):
+    response = jsonify({"status": "error", "message": message})
+    response.status_code = status
+    response.headers.extend(headers or {})
+    return response
+
+def _dispatch(login, path):
+    worker = gateway.route(login)
+    if worker is None:
+        if login is None:
+            return _error(f"Conto non indicato: usare l'header {config.GATEWAY_LOGIN_HEADER} o il prefisso /accounts/<login>. "
+                          f"Conti disponibili: {', '.join(str(login) for login in gateway.workers)}", 400)
+        return _error(f"Conto {login} non gestito dal gateway", 404)
+    if path.rstrip("/") == "/account" and request.method == "POST":
+        return _error("In modalita gateway ogni worker resta collegato al proprio conto: "
+                      "aggiungere il conto alla configurazione del gateway", 409)
+    try:
+        return gateway.forward(worker, path)
+    except WorkerUnavailable as e:
+        return _error(str(e), 503, {"Retry-After": str(config.LANE_RETRY_AFTER)})
+
+@app.route("/gateway")
+def gateway_status():
+    return jsonify({"status": "success", "workers": gateway.stats()})
+
+@app.route("/accounts/<int:login>", defaults={"path": ""}, methods=["GET", "POST", "PUT", "DELETE"])
+@app.route("/accounts/<int:login>/<path:path>", methods=["GET", "POST", "PUT", "DELETE"])
+def by_prefix(login, path):
+    return _dispatch(login, "/" + path)
+
+@app.route("/", defaults={"path": ""}, methods=["GET", "POST", "PUT", "DELETE"])
+@app.route("/<path:path>", methods=["GET", "POST", "PUT", "DELETE"])
+def by_header(path):
+    login = request.headers.get(config.GATEWAY_LOGIN_HEADER)
+    if login is not None and not login.isdigit():
+        return _error(f"Header {config.GATEWAY_LOGIN_HEADER} non valido", 400)
+    return _dispatch(int(login) if login is not None else None, "/" + path)
+
+if __name__ == "__main__":
+    setup_logging()
+    gateway.start()
+    print(f"Gateway in esecuzione sulla porta {config.GATEWAY_PORT} con {len(gateway.workers)} conti")
+    logging.info(f"Gateway in esecuzione sulla porta {config.GATEWAY_PORT} con {len(gateway.workers)} conti")
+    serve(app, config.GATEWAY_HOST, config.GATEWAY_PORT)
+    gateway.stop()
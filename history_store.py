@@ -0,0 +1,178 @@
+from executor import mt5
+import calendar
+import config
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from serialization import DEAL_FIELDS, HISTORY_ORDER_FIELDS
+
+def to_msc(dt):
+    return calendar.timegm(dt.timetuple()) * 1000
+
+def from_msc(msc):
+    return datetime(1970, 1, 1) + timedelta(milliseconds=msc)
+
+def windows(start, end, step):
+    while True:
+        stop = start + step
+        if stop >= end:
+            yield start, end
+            return
+        yield start, stop - timedelta(seconds=1)
+        start = stop
+
+class HistoryTable:
+    def __init__(self, store, name, fetch, columns, time_column, indexes, overlap=0):
+        self._store = store
+        self.name = name
+        self._fetch = fetch
+        self.columns = columns
+        self.time_column = time_column
+        self._indexes = indexes
+        self._overlap = overlap
+        self._last_sync = 0.0
+        self._refreshed = (0, 0)
+        self.row_type = namedtuple(f"{name.title()}Row", columns)
+        self._select = "SELECT " + ", ".join(f'"{c}"' for c in columns) + f" FROM {name}"
+
+    def create(self, db):
+        cols = ", ".join(f'"{c}"' + (" INTEGER PRIMARY KEY" if c == "ticket" else "") for c in self.columns)
+        db.execute(f"CREATE TABLE IF NOT EXISTS {self.name} ({cols})")
+        for column in self._indexes:
+            db.execute(f'CREATE INDEX IF NOT EXISTS ix_{self.name}_{column} ON {self.name} ("{column}")')
+
+    def _intervals(self):
+        return self._store.db.execute(
+            "SELECT start, stop FROM synced WHERE name = ? ORDER BY start", (self.name,)).fetchall()
+
+    def _missing(self, start, stop):
+        gaps = []
+        cursor = start
+        for low, high in self._intervals():
+            if high < cursor:
+                continue
+            if low > stop:
+                break
+            if low > cursor + 1:
+                gaps.append((cursor, low - 1))
+            cursor = max(cursor, high)
+        if cursor < stop:
+            gaps.append((cursor, stop))
+        return gaps
+
+    def _mark(self, start, stop):
+        db = self._store.db
+        merged = db.execute(
+            "SELECT MIN(start), MAX(stop) FROM synced WHERE name = ? AND stop >= ? AND start <= ?",
+            (self.name, start - 1, stop + 1)).fetchone()
+        start = min(start, merged[0]) if merged[0] is not None else start
+        stop = max(stop, merged[1]) if merged[1] is not None else stop
+        db.execute("DELETE FROM synced WHERE name = ? AND stop >= ? AND start <= ?", (self.name, start, stop))
+        db.execute("INSERT INTO synced (name, start, stop) VALUES (?, ?, ?)", (self.name, start, stop))
+
+    def _download(self, start, stop, settled):
+        # Una chiamata al terminale per finestra di HISTORY_WINDOW_HOURS: l'executor resta
+        # libero tra una finestra e l'altra e ogni finestra e salvata appena scaricata.
+        # Solo la parte di finestra precedente a settled e segnata come sincronizzata.
+        total = 0
+        for window_start, window_stop in windows(start, stop, timedelta(hours=config.HISTORY_WINDOW_HOURS)):
+            rows = self._fetch(window_start, window_stop)
+            if rows is None:
+                raise RuntimeError(f"Errore nella lettura della cronologia {self.name}: {mt5.last_error()}")
+            with self._store.db:
+                if rows:
+                    placeholders = ", ".join("?" * len(self.columns))
+                    self._store.db.executemany(
+                        f"INSERT OR REPLACE INTO {self.name} VALUES ({placeholders})",
+                        (tuple(getattr(row, c) for c in self.columns) for row in rows),
+                    )
+                if to_msc(window_start) <= settled:
+                    self._mark(to_msc(window_start), min(to_msc(window_stop) + 999, settled))
+            total += len(rows)
+        logging.debug("Cronologia %s: scaricati %d record dal %s al %s", self.name, total, start, stop)
+        return total
+
+    def sync(self, from_dt, to_dt, force=False):
+        with self._store.lock:
+            now = time.monotonic()
+            current = datetime.now()
+            stop = min(to_dt, current + timedelta(days=1))
+            if stop < from_dt:
+                return
+
+            # Un intervallo e definitivo solo quando e chiuso da almeno HISTORY_STORE_SETTLE secondi
+            # (per gli ordini, dalla sovrapposizione): la coda piu recente resta da sincronizzare.
+            settled = to_msc(current) - max(config.HISTORY_STORE_SETTLE, self._overlap) * 1000
+            last = to_msc(stop) + 999
+            for gap_start, gap_stop in self._missing(to_msc(from_dt), min(last, settled)):
+                self._download(from_msc(max(gap_start - self._overlap * 1000, 0)), from_msc(gap_stop), settled)
+
+            # La coda aperta puo ricevere nuovi record: si riscarica al massimo ogni
+            # HISTORY_STORE_SYNC_INTERVAL secondi, partendo dal piu recente tra l'ultimo record
+            # salvato (meno la sovrapposizione), la fine dell'ultimo intervallo sincronizzato e
+            # l'inizio del range richiesto.
+            if last <= settled:
+                return
+            db = self._store.db
+            newest = db.execute(f'SELECT MAX("{self.time_column}") FROM {self.name}').fetchone()[0]
+            synced = db.execute("SELECT MAX(stop) FROM synced WHERE name = ?", (self.name,)).fetchone()[0]
+            start = max(to_msc(from_dt), synced or 0, newest - self._overlap * 1000 if newest is not None else 0)
+            start = min(start, last)
+            fresh = now - self._last_sync < config.HISTORY_STORE_SYNC_INTERVAL
+            if not force and fresh and self._refreshed[0] <= start and last <= self._refreshed[1]:
+                return
+            self._download(from_msc(start), stop, settled)
+            self._last_sync = now
+            self._refreshed = (start, last)
+
+    def query(self, from_dt, to_dt, equals=None):
+        self.sync(from_dt, to_dt)
+        equals = equals or {}
+        where = "".join(f' AND "{column}" = ?' for column in equals)
+        with self._store.lock:
+            cursor = self._store.db.execute(
+                f'{self._select} WHERE "{self.time_column}" BETWEEN ? AND ?{where} ORDER BY "{self.time_column}", ticket',
+                (to_msc(from_dt), to_msc(to_dt) + 999, *equals.values()),
+            )
+            return list(map(self.row_type._make, cursor))
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS synced (name TEXT, start INTEGER, stop INTEGER)")
+        self.deals = HistoryTable(
+            self, "deals", lambda start, stop: mt5.history_deals_get(start, stop),
+            DEAL_FIELDS.attrs, "time_msc", ["position_id", "symbol", "time_msc"],
+        )
+        self.orders = HistoryTable(
+            self, "orders", lambda start, stop: mt5.history_orders_get(start, stop),
+            HISTORY_ORDER_FIELDS.attrs, "time_setup_msc", ["position_id", "symbol", "time_setup_msc"],
+            overlap=config.HISTORY_STORE_ORDERS_OVERLAP,
+        )
+        with self.db:
+            self.deals.create(self.db)
+            self.orders.create(self.db)
+
+    def bind(self, login):
+        # I record salvati appartengono a un solo conto: se il terminale e collegato a un conto
+        # diverso da quello registrato nel file, lo storico locale viene svuotato.
+        login = int(login)
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = 'login'").fetchone()
+            if row is not None and row[0] == login:
+                return
+            logging.info(f"Store dello storico associato al conto {login}: cronologia locale azzerata")
+            with self.db:
+                for table in ("deals", "orders", "synced"):
+                    self.db.execute(f"DELETE FROM {table}")
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('login', ?)", (login,))
+            self.deals._last_sync = self.orders._last_sync = 0.0
+
+store = HistoryStore(config.HISTORY_DB) if config.HISTORY_DB else None
@@ -0,0 +1,88 @@
+import admission
+import config
+import cProfile
+import io
+import logging
+import metrics
+import os
+import pstats
+import time
+from executor import executor
+from flask import Response, current_app, g, make_response, request
+from logs import LazyQueueHandler
+from serialization import dumps
+from session import session
+from singleflight import flights
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def output_json(data, code, headers=None):
+    started = time.perf_counter()
+    settings = current_app.config.get("RESTX_JSON", {})
+    if current_app.debug:
+        settings.setdefault("indent", 4)
+    dumped = dumps(data, **settings) + b"\n"
+    metrics.serialization_latency.observe(time.perf_counter() - started, _route())
+
+    response = make_response(dumped, code)
+    response.headers.extend(headers or {})
+    return response
+
+def _before_request():
+    g.started = time.perf_counter()
+    if config.PROFILING_ENABLED and request.headers.get("X-Profile") == "1":
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+def _after_request(response):
+    route = _route()
+    started = g.pop("started", None)
+    if started is not None:
+        metrics.http_latency.observe(time.perf_counter() - started, route, request.method, response.status_code)
+    if not response.is_streamed:
+        metrics.http_response_size.observe(response.calculate_content_length() or 0, route)
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        path = os.path.join(config.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{route.strip('/').replace('/', '_') or 'root'}.prof")
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+        logging.info(f"Profilo {request.method} {request.full_path} salvato in {path}\n{summary.getvalue()}")
+        response.headers["X-Profile-File"] = path
+    return response
+
+def _register_collected():
+    registry = metrics.registry
+    registry.register(metrics.CollectedCounter(
+        "apim_mt5_initialize_total", "Chiamate a mt5.initialize", lambda: session.initialize_count))
+    registry.register(metrics.CollectedCounter(
+        "apim_mt5_reconnect_total", "Tentativi di riconnessione al terminale", lambda: session.reconnect_count))
+    registry.register(metrics.Gauge(
+        "apim_mt5_connected", "Sessione MT5 connessa", lambda: int(session.connected)))
+    registry.register(metrics.Gauge(
+        "apim_executor_queue_depth", "Chiamate MT5 in coda", lambda: executor.stats()["queue_depth"]))
+    registry.register(metrics.Gauge(
+        "apim_lane_in_flight", "Richieste in corso per coda di priorita",
+        lambda: {(name,): lane["in_flight"] for name, lane in admission.stats().items()}, ("lane",)))
+    registry.register(metrics.CollectedCounter(
+        "apim_lane_rejected_total", "Richieste rifiutate con 429 per coda di priorita",
+        lambda: {(name,): lane["rejected"] for name, lane in admission.stats().items()}, ("lane",)))
+    registry.register(metrics.CollectedCounter(
+        "apim_coalesced_total", "Letture servite da una chiamata gia in corso o dalla cache breve",
+        lambda: {("coalesced",): flights.coalesced, ("cached",): flights.cached}, ("kind",)))
+    registry.register(metrics.CollectedCounter(
+        "apim_log_dropped_total", "Record di log scartati per coda piena", lambda: LazyQueueHandler.dropped))
+
+def install(app, api):
+    api.representation("application/json")(output_json)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    _register_collected()
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
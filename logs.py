@@ -0,0 +1,86 @@
+import atexit
+import config
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%d %H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+# Righe di audit degli ordini: logging.info(..., extra=AUDIT) non viene mai limitato.
+AUDIT = {"audit": True}
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, window, burst):
+        super().__init__()
+        self._window = window
+        self._burst = burst
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or getattr(record, "audit", False):
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started, count, suppressed = self._sites.get(key, (now, 0, 0))
+            if now - started >= self._window:
+                started, count = now, 0
+            if count >= self._burst:
+                self._sites[key] = (started, count, suppressed + 1)
+                return False
+            self._sites[key] = (started, count + 1, 0)
+        record.suppressed = suppressed
+        return True
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LazyQueueHandler.dropped += 1
+
+_listener = None
+
+def setup_logging():
+    global _listener
+    if _listener is not None:
+        return
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        config.LOG_FILE, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+
+    records = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    handler = LazyQueueHandler(records)
+    handler.addFilter(RateLimitFilter(config.LOG_RATE_WINDOW, config.LOG_RATE_BURST))
+
+    root = logging.getLogger()
+    root.setLevel(config.LOG_LEVEL)
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,179 @@
+from executor import mt5
+from protocol import Result
+from singleflight import flights
+from symbols import symbol_cache
+import config
+import logging
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+TIMEFRAMES = (
+    "M1", "M2", "M3", "M4", "M5", "M6", "M10", "M12", "M15", "M20", "M30",
+    "H1", "H2", "H3", "H4", "H6", "H8", "H12", "D1", "W1", "MN1",
+)
+
+TIMEFRAME_SECONDS = {
+    "M1": 60, "M2": 120, "M3": 180, "M4": 240, "M5": 300, "M6": 360, "M10": 600, "M12": 720, "M15": 900,
+    "M20": 1200, "M30": 1800, "H1": 3600, "H2": 7200, "H3": 10800, "H4": 14400, "H6": 21600, "H8": 28800,
+    "H12": 43200, "D1": 86400,
+}
+
+TICK_FLAGS = {"all": "COPY_TICKS_ALL", "info": "COPY_TICKS_INFO", "trade": "COPY_TICKS_TRADE"}
+
+BAR_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+
+def parse_time(value):
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value), timezone.utc)
+    for fmt in ('%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    raise ValueError(f"Data non valida: '{value}'. Formati validi: DD/MM/YYYY[ HH:MM[:SS]] o timestamp Unix")
+
+class RangeCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            array = self._entries.get(key)
+            if array is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return array
+
+    def put(self, key, array):
+        if array.nbytes > self.max_bytes:
+            return
+        array.flags.writeable = False
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = array
+            self._bytes += array.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+range_cache = RangeCache(config.MARKET_DATA_CACHE_BYTES)
+
+def _fetch_range(key, closed, fetch):
+    if closed:
+        cached = range_cache.get(key)
+        if cached is not None:
+            return cached
+    array = flights.do(("market_data",) + key, fetch)
+    if array is not None and closed:
+        range_cache.put(key, array)
+    return array
+
+def _boundaries(times, seconds):
+    buckets = times - times % seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+    return buckets[starts], starts, ends
+
+def resample_bars(rates, seconds):
+    if len(rates) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    times, starts, ends = _boundaries(rates["time"], seconds)
+    bars = np.empty(len(starts), dtype=BAR_DTYPE)
+    bars["time"] = times
+    bars["open"] = rates["open"][starts]
+    bars["high"] = np.maximum.reduceat(rates["high"], starts)
+    bars["low"] = np.minimum.reduceat(rates["low"], starts)
+    bars["close"] = rates["close"][ends]
+    bars["tick_volume"] = np.add.reduceat(rates["tick_volume"], starts)
+    bars["spread"] = np.minimum.reduceat(rates["spread"], starts)
+    bars["real_volume"] = np.add.reduceat(rates["real_volume"], starts)
+    return bars
+
+def resample_ticks(ticks, seconds, point):
+    if len(ticks) == 0:
+        return np.empty(0, dtype=BAR_DTYPE)
+    times, starts, ends = _boundaries(ticks["time"], seconds)
+    bid = ticks["bid"]
+    bars = np.empty(len(starts), dtype=BAR_DTYPE)
+    bars["time"] = times
+    bars["open"] = bid[starts]
+    bars["high"] = np.maximum.reduceat(bid, starts)
+    bars["low"] = np.minimum.reduceat(bid, starts)
+    bars["close"] = bid[ends]
+    bars["tick_volume"] = ends - starts + 1
+    bars["spread"] = np.minimum.reduceat(np.rint((ticks["ask"] - bid) / point), starts) if point else 0
+    bars["real_volume"] = np.add.reduceat(ticks["volume"], starts)
+    return bars
+
+def get_bars(symbol, timeframe, date_from=None, date_to=None, count=None, start=0, resample=None):
+    try:
+        mt5_timeframe = getattr(mt5, f"TIMEFRAME_{timeframe}")
+        if count is not None:
+            rates = mt5.copy_rates_from_pos(symbol, mt5_timeframe, start, count)
+        else:
+            seconds = TIMEFRAME_SECONDS.get(timeframe, 31 * 86400)
+            closed = date_to.timestamp() < time.time() - seconds
+            key = ("bars", symbol, timeframe, date_from.timestamp(), date_to.timestamp())
+            rates = _fetch_range(key, closed, lambda: mt5.copy_rates_range(symbol, mt5_timeframe, date_from, date_to))
+
+        if rates is None:
+            message = f"Errore nel recupero delle barre {symbol} {timeframe}: {mt5.last_error()}"
+            logging.error(message)
+            return Result.error(message, 500)
+
+        if resample is not None:
+            rates = resample_bars(rates, TIMEFRAME_SECONDS[resample])
+        return Result.ok(rates)
+
+    except Exception as e:
+        logging.error("Errore nella funzione get_bars: %s", e)
+        return Result.error(str(e), 500)
+
+def get_ticks(symbol, date_from, date_to=None, count=None, flags="all", resample=None):
+    try:
+        mt5_flags = getattr(mt5, TICK_FLAGS[flags])
+        if count is not None:
+            ticks = mt5.copy_ticks_from(symbol, date_from, count, mt5_flags)
+        else:
+            closed = date_to.timestamp() < time.time()
+            key = ("ticks", symbol, flags, date_from.timestamp(), date_to.timestamp())
+            ticks = _fetch_range(key, closed, lambda: mt5.copy_ticks_range(symbol, date_from, date_to, mt5_flags))
+
+        if ticks is None:
+            message = f"Errore nel recupero dei tick {symbol}: {mt5.last_error()}"
+            logging.error(message)
+            return Result.error(message, 500)
+
+        if resample is not None:
+            meta = symbol_cache.get(symbol)
+            ticks = resample_ticks(ticks, TIMEFRAME_SECONDS[resample], meta.point if meta else None)
+        return Result.ok(ticks)
+
+    except Exception as e:
+        logging.error("Errore nella funzione get_ticks: %s", e)
+        return Result.error(str(e), 500)
@@ -0,0 +1,123 @@
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + _labels(self.labels, key), value) for key, value in self._values.items()]
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, description, collect, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._collect = collect
+
+    def samples(self):
+        values = self._collect()
+        if not self.labels:
+            return [(self.name, values)]
+        return [(self.name + _labels(self.labels, key), value) for key, value in values.items()]
+
+class CollectedCounter(Gauge):
+    # Contatore letto da un valore che cresce soltanto, tenuto dal componente che lo incrementa.
+    kind = "counter"
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = [(key, list(counts), total, count) for key, (counts, total, count) in self._series.items()]
+        samples = []
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket
+                samples.append((self.name + "_bucket" + _labels(self.labels + ("le",), key + (bound,)), cumulative))
+            samples.append((self.name + "_sum" + _labels(self.labels, key), total))
+            samples.append((self.name + "_count" + _labels(self.labels, key), count))
+        return samples
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+http_latency = registry.register(Histogram(
+    "apim_http_request_duration_seconds", "Durata delle richieste HTTP", ("route", "method", "status")))
+http_response_size = registry.register(Histogram(
+    "apim_http_response_size_bytes", "Dimensione delle risposte HTTP", ("route",), SIZE_BUCKETS))
+serialization_latency = registry.register(Histogram(
+    "apim_serialization_duration_seconds", "Tempo di serializzazione JSON delle risposte", ("route",)))
+mt5_latency = registry.register(Histogram(
+    "apim_mt5_call_duration_seconds", "Durata delle chiamate MT5 sul thread executor", ("function",)))
+mt5_wait = registry.register(Histogram(
+    "apim_mt5_call_wait_seconds", "Attesa in coda delle chiamate MT5", ("function",)))
+mt5_errors = registry.register(Counter(
+    "apim_mt5_call_errors_total", "Chiamate MT5 terminate con eccezione", ("function",)))
+order_send_retcodes = registry.register(Counter(
+    "apim_order_send_total", "Esiti di order_send per retcode", ("retcode",)))
+
+def record_mt5_call(function, wait, duration, result=None, failed=False):
+    mt5_wait.observe(wait, function)
+    mt5_latency.observe(duration, function)
+    if failed:
+        mt5_errors.inc(function)
+    elif function == "order_send":
+        order_send_retcodes.inc(getattr(result, "retcode", "none"))
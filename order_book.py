@@ -0,0 +1,139 @@
+from executor import mt5
+import config
+import threading
+import time
+from collections import defaultdict
+
+class Index:
+    def __init__(self):
+        self.by_ticket = {}
+        self.by_symbol = defaultdict(set)
+        self.by_magic = defaultdict(set)
+
+    def put(self, row):
+        old = self.by_ticket.get(row.ticket)
+        if old is not None:
+            self._unlink(old)
+        self.by_ticket[row.ticket] = row
+        self.by_symbol[row.symbol].add(row.ticket)
+        self.by_magic[row.magic].add(row.ticket)
+
+    def remove(self, ticket):
+        old = self.by_ticket.pop(ticket, None)
+        if old is not None:
+            self._unlink(old)
+        return old
+
+    def _unlink(self, row):
+        for index, key in ((self.by_symbol, row.symbol), (self.by_magic, row.magic)):
+            tickets = index.get(key)
+            if tickets is not None:
+                tickets.discard(row.ticket)
+                if not tickets:
+                    del index[key]
+
+    def load(self, rows):
+        current = {row.ticket: row for row in rows}
+        for ticket in self.by_ticket.keys() - current.keys():
+            self.remove(ticket)
+        for ticket, row in current.items():
+            if self.by_ticket.get(ticket) != row:
+                self.put(row)
+
+    def select(self, symbol=None, magic=None):
+        tickets = None
+        if symbol is not None:
+            tickets = set(self.by_symbol.get(symbol, ()))
+        if magic is not None:
+            by_magic = self.by_magic.get(magic, set())
+            tickets = by_magic.copy() if tickets is None else tickets & by_magic
+        if tickets is None:
+            return list(self.by_ticket.values())
+        return [self.by_ticket[ticket] for ticket in sorted(tickets)]
+
+class OrderBook:
+    def __init__(self, max_age):
+        self._max_age = max_age
+        self._lock = threading.RLock()
+        self.orders = Index()
+        self.positions = Index()
+        self._orders_loaded = 0.0
+        self._positions_loaded = 0.0
+
+    def load_orders(self, orders):
+        with self._lock:
+            self.orders.load(orders or ())
+            self._orders_loaded = time.monotonic()
+
+    def load_positions(self, positions):
+        with self._lock:
+            self.positions.load(positions or ())
+            self._positions_loaded = time.monotonic()
+
+    def refresh_orders(self, force=False):
+        with self._lock:
+            if force or time.monotonic() - self._orders_loaded >= self._max_age:
+                orders = mt5.orders_get()
+                if orders is not None:
+                    self.load_orders(orders)
+
+    def refresh_positions(self, force=False):
+        with self._lock:
+            if force or time.monotonic() - self._positions_loaded >= self._max_age:
+                positions = mt5.positions_get()
+                if positions is not None:
+                    self.load_positions(positions)
+
+    def invalidate(self):
+        with self._lock:
+            self._orders_loaded = 0.0
+            self._positions_loaded = 0.0
+
+    def fetch_order(self, ticket):
+        found = mt5.orders_get(ticket=ticket)
+        with self._lock:
+            if found:
+                self.orders.put(found[0])
+                return found[0]
+            if found is not None:
+                self.orders.remove(ticket)
+            return None
+
+    def select_orders(self, symbol=None, magic=None):
+        with self._lock:
+            self.refresh_orders()
+            return self.orders.select(symbol, magic)
+
+    def select_positions(self, symbol=None, magic=None):
+        with self._lock:
+            self.refresh_positions()
+            return self.positions.select(symbol, magic)
+
+    def order_placed(self, pending):
+        # Nessuna chiamata al terminale sul percorso dell'ordine: l'indice viene solo
+        # segnato come scaduto e ricaricato alla prossima lettura.
+        with self._lock:
+            if pending:
+                self._orders_loaded = 0.0
+            else:
+                self._positions_loaded = 0.0
+
+    def order_modified(self, ticket, price, sl, tp):
+        with self._lock:
+            order = self.orders.by_ticket.get(ticket)
+            if order is not None:
+                self.orders.put(order._replace(price_open=price, sl=sl, tp=tp))
+
+    def order_removed(self, ticket):
+        with self._lock:
+            self.orders.remove(ticket)
+
+    def position_closed(self, ticket):
+        with self._lock:
+            self.positions.remove(ticket)
+
+    def stats(self):
+        with self._lock:
+            return {"orders": len(self.orders.by_ticket), "positions": len(self.positions.by_ticket)}
+
+order_book = OrderBook(config.ORDER_BOOK_MAX_AGE)
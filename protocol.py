@@ -1,209 +1,259 @@
-from flask import jsonify
-import MetaTrader5 as mt5
+from executor import CallTimeout, mt5
+from history_store import store, to_msc, windows
+from logs import AUDIT
+from order_book import order_book
+from symbols import symbol_cache
+import config
 import logging
-from datetime import datetime
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from fnmatch import fnmatchcase
+from itertools import chain
+from operator import attrgetter
+from serialization import (RECORDS, ACCOUNT_FIELDS, DEAL_FIELDS, HISTORY_ORDER_FIELDS, PLACED_ORDER_FIELDS,
+                           POSITION_FIELDS, serialize, to_record, to_records)
 
 DESCRIPTION = "Ordine caricato da Server API"
 
+@dataclass
+class Result:
+    success: bool
+    payload: object = None
+    message: str = None
+    status: int = 200
+    retcode: int = None
+    attempts: list = None
+    outcome: str = None
+
+    @classmethod
+    def ok(cls, payload=None, message=None, retcode=None, attempts=None):
+        return cls(True, payload, message, 200, retcode, attempts)
+
+    @classmethod
+    def error(cls, message, status=500, retcode=None, attempts=None):
+        return cls(False, None, message, status, retcode, attempts)
+
+    @classmethod
+    def timeout(cls, error, attempts=None):
+        if not error.running:
+            logging.error(str(error))
+            return cls(False, None, f"{error}: nessuna richiesta inviata al terminale", 503, None, attempts, "not_sent")
+        order_book.invalidate()
+        message = f"{error}. Verificare ordini e posizioni prima di ripetere la richiesta"
+        logging.error(message)
+        return cls(False, None, message, 504, None, attempts, "unknown")
+
+def _parse_range(from_date, to_date):
+    if not from_date or not to_date:
+        raise ValueError("from_date e to_date sono obbligatori (formato DD/MM/YYYY)")
+    return datetime.strptime(from_date, '%d/%m/%Y'), datetime.strptime(to_date, '%d/%m/%Y')
+
+HISTORY_TIME_COLUMNS = {"deals": "time_msc", "orders": "time_setup_msc"}
+HISTORY_TICKET_COLUMNS = {"deals": "order", "orders": "ticket"}
+
+@dataclass(frozen=True)
+class HistoryQuery:
+    group: str = None
+    position: int = None
+    ticket: int = None
+    magic: int = None
+
+    @property
+    def targeted(self):
+        return self.position is not None or self.ticket is not None
+
+    def equals(self, kind):
+        filters = {"position_id": self.position, HISTORY_TICKET_COLUMNS[kind]: self.ticket, "magic": self.magic}
+        return {column: value for column, value in filters.items() if value is not None}
+
+ALL_HISTORY = HistoryQuery()
+
+def _group_matcher(group):
+    patterns = [p.strip() for p in group.split(",") if p.strip()]
+    include = [p for p in patterns if not p.startswith("!")]
+    exclude = [p[1:] for p in patterns if p.startswith("!")]
+    return lambda symbol: ((not include or any(fnmatchcase(symbol, p) for p in include))
+                           and not any(fnmatchcase(symbol, p) for p in exclude))
+
+def _select(rows, group=None, equals=None, time_column=None, start=None, stop=None):
+    checks = [(attrgetter(column), value) for column, value in (equals or {}).items()]
+    if group:
+        checks.append((attrgetter("symbol"), _group_matcher(group)))
+    if time_column is not None and start is not None:
+        low, high = to_msc(start), to_msc(stop) + 999
+        checks.append((attrgetter(time_column), lambda t: low <= t <= high))
+    if not checks:
+        return rows
+    return [row for row in rows if all(value(get(row)) if callable(value) else get(row) == value for get, value in checks)]
+
+def _fetch_history(kind, start, stop, query=ALL_HISTORY):
+    if store is not None:
+        return _select(getattr(store, kind).query(start, stop, query.equals(kind)), query.group)
+    get = mt5.history_deals_get if kind == "deals" else mt5.history_orders_get
+    rows = get(start, stop, group=query.group) if query.group else get(start, stop)
+    if rows is None or query.magic is None:
+        return rows
+    return _select(rows, equals={"magic": query.magic})
+
+def _fetch_targeted_history(kind, start, stop, query):
+    get = mt5.history_deals_get if kind == "deals" else mt5.history_orders_get
+    rows = get(position=query.position) if query.position is not None else get(ticket=query.ticket)
+    if rows is None:
+        return None
+    equals = query.equals(kind)
+    equals.pop("position_id" if query.position is not None else HISTORY_TICKET_COLUMNS[kind])
+    return _select(rows, query.group, equals, HISTORY_TIME_COLUMNS[kind], start, stop)
+
+def _history_chunks(kind, from_date, to_date, query=ALL_HISTORY, window_hours=config.HISTORY_WINDOW_HOURS):
+    if query.targeted and not from_date and not to_date:
+        start = stop = None
+    else:
+        start, stop = _parse_range(from_date, to_date)
+
+    def chunks():
+        if query.targeted:
+            ranges = [(start, stop)]
+            fetch = _fetch_targeted_history
+        else:
+            ranges = windows(start, stop, timedelta(hours=window_hours))
+            fetch = _fetch_history
+        for window_start, window_stop in ranges:
+            rows = fetch(kind, window_start, window_stop, query)
+            if rows is None:
+                raise RuntimeError(f"Errore nella lettura della cronologia {kind}: {mt5.last_error()}")
+            yield rows
+
+    return chunks()
+
 def get_account_info():
     account_info = mt5.account_info()
     if account_info:
-        account_info_dict = {
-            "login": account_info.login,
-            "trade_mode": account_info.trade_mode,
-            "leverage": account_info.leverage,
-            "limit_orders": account_info.limit_orders,
-            "margin_so_mode": account_info.margin_so_mode,
-            "trade_allowed": account_info.trade_allowed,
-            "trade_expert": account_info.trade_expert,
-            "margin_mode": account_info.margin_mode,
-            "currency_digits": account_info.currency_digits,
-            "fifo_close": account_info.fifo_close,
-            "balance": account_info.balance,
-            "credit": account_info.credit,
-            "profit": account_info.profit,
-            "equity": account_info.equity,
-            "margin": account_info.margin,
-            "margin_free": account_info.margin_free,
-            "margin_level": account_info.margin_level,
-            "margin_so_call": account_info.margin_so_call,
-            "margin_so_so": account_info.margin_so_so,
-            "margin_initial": account_info.margin_initial,
-            "margin_maintenance": account_info.margin_maintenance,
-            "assets": account_info.assets,
-            "commission_blocked": account_info.commission_blocked,
-            "name": account_info.name,
-            "server": account_info.server,
-            "currency": account_info.currency,
-            "company": account_info.company
-        }
+        account_info_dict = to_record(account_info, ACCOUNT_FIELDS)
 
-        logging.info(f"Account info: {account_info_dict}")
-        return jsonify({"success": True, "info": account_info_dict}), 200
+        logging.debug("Account info: %s", account_info_dict)
+        return Result.ok(account_info_dict)
     else:
         error_message = f"Errore account: {mt5.last_error()}"
         logging.error(error_message)
-        return jsonify({"success": False, "message": error_message}), 500
+        return Result.error(error_message, 500)
 
-def get_orders():
+def get_orders(fmt=RECORDS):
     orders = mt5.positions_get()
+    if orders is not None:
+        order_book.load_positions(orders)
 
     if orders is None or len(orders) == 0:
-        message = "Non esistono ordini pendenti" if orders is None else f"Errore: {mt5.last_error()}"
-        logging.error(message)
-        return jsonify({"success": True, "message": message, "orders": []}), 200
-
-    orders_readable = []
-    for order in orders:
-        orders_readable.append({
-            "ticket": order.ticket,
-            "time_setup": order.time,
-            "symbol": order.symbol,
-            "volume": order.volume,
-            "price_open": order.price_open,
-            "sl": order.sl,
-            "tp": order.tp,
-            "price_current": order.price_current,
-            "profit": order.profit,
-            "comment": order.comment
-        })
-
-    return jsonify({"success": True, "orders": orders_readable}), 200
-
-def get_history_deals_orders(from_date, to_date):
+        message = f"Errore: {mt5.last_error()}" if orders is None else "Non esistono ordini pendenti"
+        logging.log(logging.ERROR if orders is None else logging.DEBUG, message)
+        return Result.ok(serialize((), POSITION_FIELDS, fmt), message)
+
+    return Result.ok(serialize(orders, POSITION_FIELDS, fmt))
+
+def fetch_history_deals(start, stop, window_hours=config.HISTORY_WINDOW_HOURS):
+    rows = []
+    for window_start, window_stop in windows(start, stop, timedelta(hours=window_hours)):
+        chunk = _fetch_history("deals", window_start, window_stop)
+        if chunk is None:
+            raise RuntimeError(f"Errore nella lettura della cronologia deals: {mt5.last_error()}")
+        rows.extend(chunk)
+    return rows
+
+def _get_history(kind, spec, from_date, to_date, fmt, query, fields):
     try:
-        from_date_dt = datetime.strptime(from_date, '%d/%m/%Y')
-        to_date_dt = datetime.strptime(to_date, '%d/%m/%Y')
-        deals_orders = mt5.history_deals_get(from_date_dt, to_date_dt)
-
-        if deals_orders is None or len(deals_orders) == 0:
-            message = "Nessuna cronologia ordini trovata" if deals_orders is None else f"Errore: {mt5.last_error()}"
-            logging.error(message)
-            return jsonify({"success": True, "message": message, "orders": []}), 200
-
-        orders_readable = []
-        for deal in deals_orders:
-            orders_readable.append({
-                "ticket": deal.ticket,
-                "order": deal.order,
-                "time": deal.time,
-                "time_msc": deal.time_msc,
-                "type": deal.type,
-                "entry": deal.entry,
-                "magic": deal.magic,
-                "position_id": deal.position_id,
-                "reason": deal.reason,
-                "volume": deal.volume,
-                "price": deal.price,
-                "commission": deal.commission,
-                "swap": deal.swap,
-                "profit": deal.profit,
-                "fee": deal.fee,
-                "symbol": deal.symbol,
-                "comment": deal.comment,
-                "external_id": deal.external_id,
-            })
-
-        return jsonify({"success": True, "orders": orders_readable}), 200
+        spec = spec.project(fields) if fields else spec
+        rows = list(chain.from_iterable(_history_chunks(kind, from_date, to_date, query)))
 
-    except Exception as e:
-        logging.error(f"Errore nella funzione get_history_deals_orders: {e}")
-        return jsonify({"success": False, "message": str(e)}), 500
+        if not rows:
+            message = "Nessuna cronologia ordini trovata"
+            logging.debug(message)
+            return Result.ok(serialize((), spec, fmt), message)
 
-def get_history_orders(from_date, to_date):
-    try:
+        return Result.ok(serialize(rows, spec, fmt))
 
-        from_date_dt = datetime.strptime(from_date, '%d/%m/%Y')
-        to_date_dt = datetime.strptime(to_date, '%d/%m/%Y')
-        orders = mt5.history_orders_get(from_date_dt, to_date_dt)
+    except ValueError as e:
+        return Result.error(str(e), 400)
+    except Exception as e:
+        logging.error("Errore nella lettura della cronologia %s: %s", kind, e)
+        return Result.error(str(e), 500)
 
-        if orders is None or len(orders) == 0:
-            message = "Nessuna cronologia ordini trovata" if orders is None else f"Errore: {mt5.last_error()}"
-            logging.error(message)
-            return jsonify({"success": True, "message": message, "orders": []}), 200
-
-        orders_readable = []
-        for order in orders:
-            orders_readable.append({
-                "ticket": order.ticket,
-                "time_setup": order.time_setup,
-                "time_setup_msc": order.time_setup_msc,
-                "time_done": order.time_done,
-                "time_done_msc": order.time_done_msc,
-                "time_expiration": order.time_expiration,
-                "type": order.type,
-                "type_time": order.type_time,
-                "type_filling": order.type_filling,
-                "state": order.state,
-                "magic": order.magic,
-                "position_id": order.position_id,
-                "reason": order.reason,
-                "volume_initial": order.volume_initial,
-                "volume_current": order.volume_current,
-                "price_open": order.price_open,
-                "sl": order.sl,
-                "tp": order.tp,
-                "price_current": order.price_current,
-                "price_stoplimit": order.price_stoplimit,
-                "symbol": order.symbol,
-                "comment": order.comment,
-                "external_id": order.external_id
-            })
-
-        return jsonify({"success": True, "orders": orders_readable}), 200
+def get_history_deals_orders(from_date, to_date, fmt=RECORDS, query=ALL_HISTORY, fields=None):
+    return _get_history("deals", DEAL_FIELDS, from_date, to_date, fmt, query, fields)
 
-    except Exception as e:
-        logging.error(f"Errore nella funzione get_history_orders: {e}")
-        return jsonify({"success": False, "message": str(e)}), 500
+def get_history_orders(from_date, to_date, fmt=RECORDS, query=ALL_HISTORY, fields=None):
+    return _get_history("orders", HISTORY_ORDER_FIELDS, from_date, to_date, fmt, query, fields)
 
-def get_placed_orders():
+def get_placed_orders(fmt=RECORDS):
     try:
         orders = mt5.orders_get()
+        if orders is not None:
+            order_book.load_orders(orders)
 
         if orders is None or len(orders) == 0:
             message = f"Non esistono ordini pendenti: {mt5.last_error()}"
-            logging.info(message)
-            return jsonify({"success": True, "message": message, "orders": []}), 200
-
-        orders_readable = []
-        for order in orders:
-            orders_readable.append({
-                "ticket": order.ticket,
-                "time_setup": order.time_setup,
-                "time_setup_msc": order.time_setup_msc,
-                "time_done": order.time_done,
-                "time_done_msc": order.time_done_msc,
-                "time_expiration": order.time_expiration,
-                "type": order.type,
-                "type_time": order.type_time,
-                "type_filling": order.type_filling,
-                "state": order.state,
-                "magic": order.magic,
-                "position_id": order.position_id,
-                "position_by_id": order.position_by_id,
-                "reason": order.reason,
-                "volume_initial": order.volume_initial,
-                "volume_current": order.volume_current,
-                "price_open": order.price_open,
-                "sl": order.sl,
-                "tp": order.tp,
-                "price_current": order.price_current,
-                "price_stoplimit": order.price_stoplimit,
-                "symbol": order.symbol,
-                "comment": order.comment,
-                "external_id": order.external_id
-            })
-
-        return jsonify({"success": True, "orders": orders_readable}), 200
+            logging.debug(message)
+            return Result.ok(serialize((), PLACED_ORDER_FIELDS, fmt), message)
 
-    except Exception as e:
-        logging.error(f"Errore nella funzione get_placed_orders: {e}")
-        return jsonify({"success": False, "message": str(e)}), 500
-
-def create_order(symbol, order_type, volume, price=None, sl=None, tp=None, magic=0):
-
-    infoSymbol = mt5.symbol_info(symbol)
+        return Result.ok(serialize(orders, PLACED_ORDER_FIELDS, fmt))
 
+    except Exception as e:
+        logging.error("Errore nella funzione get_placed_orders: %s", e)
+        return Result.error(str(e), 500)
+
+def _iter_history(kind, spec, from_date, to_date, query, fields, window_hours):
+    spec = spec.project(fields) if fields else spec
+    return (to_records(rows, spec) for rows in _history_chunks(kind, from_date, to_date, query, window_hours))
+
+def iter_history_deals_orders(from_date, to_date, query=ALL_HISTORY, fields=None, window_hours=config.HISTORY_WINDOW_HOURS):
+    return _iter_history("deals", DEAL_FIELDS, from_date, to_date, query, fields, window_hours)
+
+def iter_history_orders(from_date, to_date, query=ALL_HISTORY, fields=None, window_hours=config.HISTORY_WINDOW_HOURS):
+    return _iter_history("orders", HISTORY_ORDER_FIELDS, from_date, to_date, query, fields, window_hours)
+
+def _send_order(request, attempts):
+    symbol = request["symbol"]
+    market = request["action"] == mt5.TRADE_ACTION_DEAL
+    modes = symbol_cache.filling_modes(symbol, market)
+    requotes = 0
+    while True:
+        request["type_filling"] = modes[0]
+        started = time.perf_counter()
+        try:
+            result = mt5.order_send(request)
+        except CallTimeout as e:
+            attempts.append({"type_filling": request["type_filling"], "price": request.get("price"), "retcode": None,
+                             "comment": str(e), "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)})
+            raise
+        attempts.append({
+            "type_filling": request["type_filling"],
+            "price": request.get("price"),
+            "retcode": result.retcode if result is not None else None,
+            "comment": result.comment if result is not None else str(mt5.last_error()),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        })
+        if result is None:
+            return None
+
+        if result.retcode == mt5.TRADE_RETCODE_INVALID_FILL and len(modes) > 1:
+            logging.warning("Filling mode %s non supportato per %s, nuovo tentativo con %s", modes[0], symbol, modes[1])
+            modes = modes[1:]
+            continue
+
+        if (market and requotes < config.ORDER_REQUOTE_RETRIES and result.retcode in
+                (mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED, mt5.TRADE_RETCODE_PRICE_OFF)):
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is None:
+                return result
+            requotes += 1
+            request["price"] = tick.ask if request["type"] == mt5.ORDER_TYPE_BUY else tick.bid
+            logging.warning("Requote su %s (retcode %s), nuovo tentativo a %s", symbol, result.retcode, request["price"])
+            continue
+
+        if result.retcode == mt5.TRADE_RETCODE_DONE:
+            symbol_cache.remember_filling(symbol, market, request["type_filling"])
+        return result
+
+def create_order(symbol, order_type, volume, price=None, sl=None, tp=None, magic=0, tick=None):
     order_type_mapping = {
         'buy': mt5.ORDER_TYPE_BUY,
         'sell': mt5.ORDER_TYPE_SELL,
@@ -216,17 +266,17 @@ def create_order(symbol, order_type, volume, price=None, sl=None, tp=None, magic
     if order_type not in order_type_mapping:
         message = f"Tipo di ordine '{order_type}' non valido."
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 500
+        return Result.error(message, 500)
 
-    symbol_info = mt5.symbol_info(symbol)
+    symbol_info = symbol_cache.get(symbol)
     if not symbol_info:
         message = f"Simbolo {symbol} non trovato."
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 400
-    if not symbol_info.visible and not mt5.symbol_select(symbol, True):
+        return Result.error(message, 400)
+    if not symbol_info.visible:
         message = f"Errore nell'attivare il simbolo {symbol}."
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 400
+        return Result.error(message, 400)
 
     stops_level = symbol_info.trade_stops_level
     point = symbol_info.point
@@ -234,14 +284,16 @@ def create_order(symbol, order_type, volume, price=None, sl=None, tp=None, magic
     if stops_level is None:
         message = f"Impossibile ottenere il livello minimo di stop per il simbolo {symbol}."
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 400
+        return Result.error(message, 400)
 
     if price is None and order_type in ['buy', 'sell']:
-        if order_type == 'buy':
-            price = mt5.symbol_info_tick(symbol).ask
-        elif order_type == 'sell':
-            price = mt5.symbol_info_tick(symbol).bid
-        logging.info(f"Prezzo calcolato automaticamente per {order_type}: {price}")
+        tick = tick or mt5.symbol_info_tick(symbol)
+        if tick is None:
+            message = f"Impossibile ottenere il prezzo corrente per il simbolo {symbol}: {mt5.last_error()}"
+            logging.error(message)
+            return Result.error(message, 500)
+        price = tick.ask if order_type == 'buy' else tick.bid
+        logging.info("Prezzo calcolato automaticamente per %s: %s", order_type, price)
 
     if order_type in ['buy', 'sell']:
         request = {
@@ -253,7 +305,6 @@ def create_order(symbol, order_type, volume, price=None, sl=None, tp=None, magic
                 "deviation": 10,
                 "magic": magic,
                 "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling":mt5.ORDER_FILLING_IOC,
                 "comment": DESCRIPTION
             }
     else:
@@ -268,37 +319,37 @@ def create_order(symbol, order_type, volume, price=None, sl=None, tp=None, magic
             "deviation": 10,
             "magic": magic,
             "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_RETURN,
             "comment": DESCRIPTION
         }
 
-    result = mt5.order_send(request)
+    attempts = []
+    try:
+        result = _send_order(request, attempts)
+    except CallTimeout as e:
+        return Result.timeout(e, attempts)
     if result is None:
         message = mt5.last_error()
         message = f"Errore nell'invio dell'ordine: {message}"
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 500
+        return Result.error(message, 500, attempts=attempts)
 
     if result.retcode != mt5.TRADE_RETCODE_DONE:
         message = f"Errore nell'invio dell'ordine: {result.comment}"
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 400
+        return Result.error(message, 400, result.retcode, attempts)
 
-    logging.info(f"Ordine creato con successo: {result}")
-    return jsonify({"success": True, "order": result.order}), 200
+    order_book.order_placed(pending=order_type not in ['buy', 'sell'])
+    logging.info("Ordine creato con successo: %s", result, extra=AUDIT)
+    return Result.ok(result.order, retcode=result.retcode, attempts=attempts)
 
-def update_order(ticket, price=None, stop_loss=None, take_profit=None):
-    orders = mt5.orders_get()
-    if not orders:
-        message = f"Nessun ordine pendente trovato: {mt5.last_error()}"
-        logging.info(message)
-        return jsonify({"success": False, "message": message}), 404
-
-    order = next((o for o in orders if o.ticket == ticket), None)
+def update_order(ticket, price=None, stop_loss=None, take_profit=None, order=None):
+    # I valori omessi vengono presi dall'ordine letto adesso dal terminale, non dall'indice:
+    # l'indice puo essere vecchio fino a ORDER_BOOK_MAX_AGE secondi.
+    order = order or order_book.fetch_order(ticket)
     if not order:
         message = f"Ordine con ticket {ticket} non trovato."
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 404
+        return Result.error(message, 404)
 
     request = {
         "action": mt5.TRADE_ACTION_MODIFY,
@@ -309,45 +360,201 @@ def update_order(ticket, price=None, stop_loss=None, take_profit=None):
         "tp": take_profit if take_profit is not None else order.tp,
     }
 
-    result = mt5.order_send(request)
+    try:
+        result = mt5.order_send(request)
+    except CallTimeout as e:
+        return Result.timeout(e)
     if result is None:
         message = f"Errore di comunicazione con il server: {mt5.last_error()}"
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 500
+        return Result.error(message, 500)
 
     if result.retcode != mt5.TRADE_RETCODE_DONE:
         message = f"Errore nell'aggiornamento dell'ordine. Retcode: {result.retcode}, Details: {result.comment}"
-        logging.error(f"Errore nell'aggiornamento dell'ordine. Retcode: {result.retcode}, Details: {result.comment}")
-        return jsonify({"success": False, "message": message}), 500
-
-    logging.info(f"Ordine con ticket {ticket} aggiornato con successo")
-    return jsonify({"success": True, "message": "Ordine aggiornato con successo"}), 200
-
-def delete_order(ticket):      
-    orders = mt5.orders_get(ticket=ticket)
-   
-    if not orders:
-        message = f"Nessun ordine trovato o errore: {mt5.last_error()}"
         logging.error(message)
-        return jsonify({"success": False, "message": message}), 500
+        order_book.invalidate()
+        return Result.error(message, 500, result.retcode)
 
-    logging.info(f"Ordine {ticket} da eliminare")
-    
+    order_book.order_modified(ticket, request["price"], request["sl"], request["tp"])
+    logging.info("Ordine con ticket %s aggiornato con successo", ticket, extra=AUDIT)
+    return Result.ok(message="Ordine aggiornato con successo", retcode=result.retcode)
+
+def _remove_order(ticket):
     request = {
         "action": mt5.TRADE_ACTION_REMOVE,
         "order": ticket,
     }
     
-    result = mt5.order_send(request)
+    try:
+        result = mt5.order_send(request)
+    except CallTimeout as e:
+        return Result.timeout(e)
     if result is None:
         error_message = f"Errore di comunicazione con il server: {mt5.last_error()}"
         logging.error(error_message)
-        return jsonify({"success": False, "message": error_message}), 500
+        return Result.error(error_message, 500)
 
     if result.retcode != mt5.TRADE_RETCODE_DONE:
         error_message = f"Errore nell'annullamento dell'ordine. Retcode: {result.retcode}, Commento: {result.comment}"
         logging.error(error_message)
-        return jsonify({"success": False, "message": error_message}), 500
+        order_book.invalidate()
+        return Result.error(error_message, 500, result.retcode)
+
+    order_book.order_removed(ticket)
+    logging.info("Ordine con ticket %s cancellato con successo.", ticket, extra=AUDIT)
+    return Result.ok(message="Ordine cancellato con successo", retcode=result.retcode)
+
+def delete_order(ticket):
+    # Nessuna lettura preventiva dell'ordine: il terminale rifiuta da solo un ticket inesistente
+    # e la cancellazione costa una sola chiamata.
+    logging.info("Ordine %s da eliminare", ticket, extra=AUDIT)
+    return _remove_order(ticket)
+
+def close_position(position, tick=None):
+    tick = tick or mt5.symbol_info_tick(position.symbol)
+    if tick is None:
+        message = f"Impossibile ottenere il prezzo corrente per il simbolo {position.symbol}: {mt5.last_error()}"
+        logging.error(message)
+        return Result.error(message, 500)
+
+    is_buy = position.type == mt5.POSITION_TYPE_BUY
+    request = {
+        "action": mt5.TRADE_ACTION_DEAL,
+        "symbol": position.symbol,
+        "volume": position.volume,
+        "type": mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY,
+        "position": position.ticket,
+        "price": tick.bid if is_buy else tick.ask,
+        "deviation": 10,
+        "magic": position.magic,
+        "type_time": mt5.ORDER_TIME_GTC,
+        "comment": DESCRIPTION
+    }
+
+    attempts = []
+    try:
+        result = _send_order(request, attempts)
+    except CallTimeout as e:
+        return Result.timeout(e, attempts)
+    if result is None:
+        message = f"Errore di comunicazione con il server: {mt5.last_error()}"
+        logging.error(message)
+        return Result.error(message, 500, attempts=attempts)
+
+    if result.retcode != mt5.TRADE_RETCODE_DONE:
+        message = f"Errore nella chiusura della posizione {position.ticket}. Retcode: {result.retcode}, Commento: {result.comment}"
+        logging.error(message)
+        order_book.invalidate()
+        return Result.error(message, 400, result.retcode, attempts)
+
+    order_book.position_closed(position.ticket)
+    logging.info("Posizione %s chiusa con successo: %s", position.ticket, result, extra=AUDIT)
+    return Result.ok(result.order, "Posizione chiusa con successo", result.retcode, attempts)
+
+BATCH_ITEM_TYPES = {dict: "un oggetto", int: "un intero"}
+
+def _run_batch(items, execute, fail_fast, item_type=None):
+    results = []
+    started = time.perf_counter()
+    for index, item in enumerate(items):
+        item_started = time.perf_counter()
+        try:
+            if item_type is not None and not isinstance(item, item_type):
+                raise TypeError(f"deve essere {BATCH_ITEM_TYPES[item_type]}")
+            ticket, result = execute(item)
+        except (KeyError, TypeError, ValueError) as e:
+            ticket, result = None, Result.error(f"Elemento non valido: {e}", 400)
+        results.append({
+            "index": index,
+            "success": result.success,
+            "ticket": ticket,
+            "retcode": result.retcode,
+            "message": result.message,
+            "elapsed_ms": round((time.perf_counter() - item_started) * 1000, 3),
+        })
+        if result.attempts is not None:
+            results[-1]["attempts"] = result.attempts
+        if result.outcome is not None:
+            results[-1]["outcome"] = result.outcome
+        if fail_fast and not result.success:
+            results.extend(
+                {"index": skipped, "success": False, "ticket": None, "retcode": None,
+                 "message": "Non eseguito: batch interrotto (fail_fast)", "elapsed_ms": 0.0}
+                for skipped in range(index + 1, len(items))
+            )
+            break
+
+    failed = sum(not r["success"] for r in results)
+    return Result.ok({
+        "results": results,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
+
+def create_orders(specs, fail_fast=False):
+    valid = [spec for spec in specs if isinstance(spec, dict)]
+    symbols = {spec.get('symbol') for spec in valid} - {None}
+    market_symbols = {spec.get('symbol') for spec in valid if spec.get('type') in ['buy', 'sell']} & symbols
+    for symbol in symbols:
+        symbol_cache.get(symbol)
+    ticks = {symbol: mt5.symbol_info_tick(symbol) for symbol in market_symbols}
+
+    def execute(spec):
+        result = create_order(
+            spec['symbol'], spec['type'], spec['volume'], spec.get('price'), spec.get('stop_loss'),
+            spec.get('take_profit'), spec.get('magic', 0), tick=ticks.get(spec['symbol']),
+        )
+        return result.payload, result
+
+    return _run_batch(specs, execute, fail_fast, dict)
+
+def update_orders(updates, fail_fast=False):
+    order_book.refresh_orders(force=True)
+
+    def execute(update):
+        ticket = update['ticket']
+        order = order_book.orders.by_ticket.get(ticket)
+        if order is None:
+            return ticket, Result.error(f"Ordine con ticket {ticket} non trovato.", 404)
+        return ticket, update_order(
+            ticket, update.get('price') or None, update.get('stop_loss') or None, update.get('take_profit') or None,
+            order,
+        )
+
+    return _run_batch(updates, execute, fail_fast, dict)
+
+def delete_orders(tickets, fail_fast=False):
+    def execute(ticket):
+        return ticket, delete_order(ticket)
+
+    return _run_batch(tickets, execute, fail_fast, int)
+
+def cancel_orders(symbol=None, magic=None):
+    orders = mt5.orders_get()
+    if orders is None:
+        message = f"Errore nella lettura degli ordini pendenti: {mt5.last_error()}"
+        logging.error(message)
+        return Result.error(message, 500)
+    order_book.load_orders(orders)
+
+    def execute(order):
+        return order.ticket, _remove_order(order.ticket)
+
+    return _run_batch(order_book.select_orders(symbol, magic), execute, False)
+
+def close_positions(symbol=None, magic=None):
+    positions = mt5.positions_get()
+    if positions is None:
+        message = f"Errore nella lettura delle posizioni aperte: {mt5.last_error()}"
+        logging.error(message)
+        return Result.error(message, 500)
+    order_book.load_positions(positions)
+
+    selected = order_book.select_positions(symbol, magic)
+    ticks = {symbol: mt5.symbol_info_tick(symbol) for symbol in {position.symbol for position in selected}}
+
+    def execute(position):
+        return position.ticket, close_position(position, ticks.get(position.symbol))
 
-    logging.info(f"Ordine con ticket {ticket} cancellato con successo.")
-    return jsonify({"success": True, "message": "Ordine cancellato con successo"}), 200
\ No newline at end of file
+    return _run_batch(selected, execute, False)
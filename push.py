@@ -0,0 +1,166 @@
+from executor import mt5
+import admission
+import config
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from snapshots import poller
+
+STREAMS = ("ticks", "positions", "orders", "account")
+
+SNAPSHOT_STREAMS = {"active": "positions", "placed": "orders"}
+
+class Subscriber:
+    def __init__(self, symbols, streams, max_events):
+        self.symbols = symbols
+        self.streams = streams
+        self.dropped = 0
+        self._events = deque()
+        self._ticks = OrderedDict()
+        self._max_events = max_events
+        self._cond = threading.Condition()
+
+    def wants(self, stream, symbol=None):
+        if stream not in self.streams:
+            return False
+        return symbol is None or not self.symbols or symbol in self.symbols
+
+    def offer(self, stream, data, symbol=None):
+        with self._cond:
+            if stream == "ticks":
+                self._ticks.pop(symbol, None)
+                self._ticks[symbol] = data
+            else:
+                if len(self._events) >= self._max_events:
+                    self._events.popleft()
+                    self.dropped += 1
+                self._events.append((stream, data))
+            self._cond.notify()
+
+    def drain(self, timeout):
+        with self._cond:
+            if not self._events and not self._ticks:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            events.extend(("ticks", tick) for tick in self._ticks.values())
+            if self.dropped:
+                events.append(("dropped", {"count": self.dropped}))
+                self.dropped = 0
+            self._events.clear()
+            self._ticks.clear()
+            return events
+
+class Broadcaster:
+    def __init__(self, tick_interval, max_events):
+        self._tick_interval = tick_interval
+        self._max_events = max_events
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._state = {}
+        self._last_ticks = {}
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        poller.subscribe(self.on_snapshot)
+        # Gli snapshot gia letti prima dell'iscrizione diventano lo stato iniziale: senza,
+        # la prima variazione andrebbe persa e i nuovi iscritti non riceverebbero lo snapshot.
+        for name in SNAPSHOT_STREAMS:
+            snapshot = poller.latest(name)
+            if snapshot is not None:
+                self._state.setdefault(name, {row["ticket"]: row for row in snapshot.payload})
+        self._thread = threading.Thread(target=self._run_ticks, name="tick-producer", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, symbols, streams):
+        subscriber = Subscriber(symbols, streams, self._max_events)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        for name, stream in SNAPSHOT_STREAMS.items():
+            state = self._state.get(name)
+            if state is not None:
+                self._offer_snapshot(subscriber, stream, state)
+        return subscriber
+
+    def _offer_snapshot(self, subscriber, stream, state):
+        if subscriber.wants(stream):
+            rows = [row for row in state.values() if subscriber.wants(stream, row.get("symbol"))]
+            subscriber.offer(stream, {"event": "snapshot", stream: rows})
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, stream, data, symbol=None):
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.wants(stream, symbol)]
+        for subscriber in subscribers:
+            subscriber.offer(stream, data, symbol)
+
+    def on_snapshot(self, name, payload):
+        if name == "account":
+            self.publish("account", {"event": "changed", "info": payload})
+            return
+
+        stream = SNAPSHOT_STREAMS[name]
+        current = {row["ticket"]: row for row in payload}
+        previous = self._state.get(name)
+        self._state[name] = current
+        if previous is None:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                self._offer_snapshot(subscriber, stream, current)
+            return
+
+        for ticket, row in current.items():
+            old = previous.get(ticket)
+            if old is None:
+                self.publish(stream, {"event": "added", "data": row}, row["symbol"])
+            elif old != row:
+                self.publish(stream, {"event": "changed", "data": row}, row["symbol"])
+        for ticket in previous.keys() - current.keys():
+            row = previous[ticket]
+            self.publish(stream, {"event": "removed", "data": row}, row["symbol"])
+
+    def _tick_symbols(self):
+        with self._lock:
+            subscribers = [s for s in self._subscribers if "ticks" in s.streams]
+        symbols = set()
+        for subscriber in subscribers:
+            symbols.update(subscriber.symbols or config.WARM_SYMBOLS)
+        return symbols
+
+    def _run_ticks(self):
+        while True:
+            started = time.monotonic()
+            try:
+                symbols = self._tick_symbols()
+                with admission.priority(admission.SNAPSHOT):
+                    for symbol in symbols:
+                        tick = mt5.symbol_info_tick(symbol)
+                        if tick is None or self._last_ticks.get(symbol) == tick.time_msc:
+                            continue
+                        self._last_ticks[symbol] = tick.time_msc
+                        self.publish("ticks", {"symbol": symbol, "bid": tick.bid, "ask": tick.ask, "last": tick.last,
+                                               "time_msc": tick.time_msc}, symbol)
+            except Exception:
+                logging.exception("Errore nella lettura dei tick")
+            time.sleep(max(0.0, self._tick_interval - (time.monotonic() - started)))
+
+def sse(subscriber, broadcaster):
+    try:
+        yield ": connesso\n\n"
+        while True:
+            events = subscriber.drain(config.PUSH_HEARTBEAT)
+            if not events:
+                yield ": ping\n\n"
+                continue
+            yield "".join(f"event: {stream}\ndata: {json.dumps(data)}\n\n" for stream, data in events)
+    finally:
+        broadcaster.unsubscribe(subscriber)
+
+broadcaster = Broadcaster(config.PUSH_TICK_INTERVAL, config.PUSH_MAX_EVENTS)
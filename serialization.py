@@ -0,0 +1,156 @@
+import config
+import io
+import json
+import numpy as np
+from operator import attrgetter
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RECORDS = "records"
+ROWS = "rows"
+COLUMNAR = "columnar"
+FORMATS = (RECORDS, ROWS, COLUMNAR)
+
+NPY = "npy"
+ARROW = "arrow"
+BINARY_FORMATS = (NPY, ARROW)
+BINARY_CHUNK_SIZE = 1024 * 1024
+
+class FieldSpec:
+    def __init__(self, fields):
+        fields = [(f, f) if isinstance(f, str) else f for f in fields]
+        self.names = tuple(name for name, _ in fields)
+        self.attrs = tuple(attr for _, attr in fields)
+        getter = attrgetter(*self.attrs)
+        self.getter = getter if len(self.attrs) > 1 else lambda row: (getter(row),)
+
+    def records(self, rows):
+        # Se le righe sono tuple con esattamente questi campi si accoppiano ai nomi senza getattr.
+        names = self.names
+        if rows and getattr(rows[0], "_fields", None) == self.attrs:
+            return [dict(zip(names, row)) for row in rows]
+        getter = self.getter
+        return [dict(zip(names, getter(row))) for row in rows]
+
+    def project(self, names):
+        unknown = [name for name in names if name not in self.names]
+        if unknown:
+            raise ValueError(f"Campi non validi: {', '.join(unknown)}")
+        return FieldSpec([(name, self.attrs[self.names.index(name)]) for name in names])
+
+ACCOUNT_FIELDS = FieldSpec([
+    "login", "trade_mode", "leverage", "limit_orders", "margin_so_mode", "trade_allowed", "trade_expert",
+    "margin_mode", "currency_digits", "fifo_close", "balance", "credit", "profit", "equity", "margin",
+    "margin_free", "margin_level", "margin_so_call", "margin_so_so", "margin_initial", "margin_maintenance",
+    "assets", "commission_blocked", "name", "server", "currency", "company",
+])
+
+POSITION_FIELDS = FieldSpec([
+    "ticket", ("time_setup", "time"), "symbol", "volume", "price_open", "sl", "tp", "price_current", "profit", "comment",
+])
+
+DEAL_FIELDS = FieldSpec([
+    "ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason", "volume", "price",
+    "commission", "swap", "profit", "fee", "symbol", "comment", "external_id",
+])
+
+HISTORY_ORDER_FIELDS = FieldSpec([
+    "ticket", "time_setup", "time_setup_msc", "time_done", "time_done_msc", "time_expiration", "type", "type_time",
+    "type_filling", "state", "magic", "position_id", "reason", "volume_initial", "volume_current", "price_open",
+    "sl", "tp", "price_current", "price_stoplimit", "symbol", "comment", "external_id",
+])
+
+PLACED_ORDER_FIELDS = FieldSpec([
+    "ticket", "time_setup", "time_setup_msc", "time_done", "time_done_msc", "time_expiration", "type", "type_time",
+    "type_filling", "state", "magic", "position_id", "position_by_id", "reason", "volume_initial", "volume_current",
+    "price_open", "sl", "tp", "price_current", "price_stoplimit", "symbol", "comment", "external_id",
+])
+
+def dumps(data, **settings):
+    if orjson is not None and config.JSON_ENCODER != "json" and not settings:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, **settings).encode()
+
+def to_record(row, spec):
+    return dict(zip(spec.names, spec.getter(row)))
+
+def to_records(rows, spec):
+    return spec.records(rows)
+
+def to_rows(rows, spec):
+    return {"fields": list(spec.names), "rows": list(map(spec.getter, rows))}
+
+def _dtype(value):
+    return None if isinstance(value, (int, float)) else object
+
+def to_arrays(rows, spec):
+    values = list(map(spec.getter, rows))
+    if not values:
+        return {name: np.empty(0, dtype=object) for name in spec.names}
+    columns = zip(*values)
+    return {
+        name: np.array(column, dtype=_dtype(first))
+        for name, first, column in zip(spec.names, values[0], columns)
+    }
+
+def to_columns(rows, spec):
+    if not rows:
+        return {"fields": list(spec.names), "columns": {name: [] for name in spec.names}}
+    columns = zip(*map(spec.getter, rows))
+    return {"fields": list(spec.names), "columns": dict(zip(spec.names, map(list, columns)))}
+
+def serialize(rows, spec, fmt=RECORDS):
+    if fmt == RECORDS:
+        return to_records(rows, spec)
+    if fmt == ROWS:
+        return to_rows(rows, spec)
+    if fmt == COLUMNAR:
+        return to_columns(rows, spec)
+    raise ValueError(f"Formato '{fmt}' non valido. Valori validi: {', '.join(FORMATS)}")
+
+def to_ndjson(chunks):
+    for records in chunks:
+        if records:
+            yield b"".join(dumps(record) + b"\n" for record in records)
+
+def serialize_array(array, fmt=RECORDS):
+    names = list(array.dtype.names)
+    if fmt == RECORDS:
+        return [dict(zip(names, row)) for row in array.tolist()]
+    if fmt == ROWS:
+        return {"fields": names, "rows": array.tolist()}
+    if fmt == COLUMNAR:
+        return {"fields": names, "columns": {name: array[name].tolist() for name in names}}
+    raise ValueError(f"Formato '{fmt}' non valido. Valori validi: {', '.join(FORMATS + BINARY_FORMATS)}")
+
+def _chunks(parts):
+    for part in parts:
+        view = memoryview(part).cast("B")
+        for start in range(0, len(view), BINARY_CHUNK_SIZE):
+            yield bytes(view[start:start + BINARY_CHUNK_SIZE])
+
+def to_npy(array):
+    array = np.ascontiguousarray(array)
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(array))
+    data = array.view(np.uint8)
+    return header.tell() + data.nbytes, _chunks([header.getbuffer(), data])
+
+def to_arrow(array):
+    if pa is None:
+        raise RuntimeError("Formato arrow non disponibile: installare pyarrow")
+    names = list(array.dtype.names)
+    batch = pa.RecordBatch.from_arrays([pa.array(np.ascontiguousarray(array[name])) for name in names], names=names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    buffer = sink.getvalue()
+    return buffer.size, _chunks([buffer])
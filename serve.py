@@ -0,0 +1,146 @@
+import config
+import json
+import logging
+import signal
+import threading
+import time
+from werkzeug.serving import WSGIRequestHandler, make_server
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
+
+WRITE_METHODS = ("POST", "PUT", "DELETE")
+
+class Drain:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.rejected = 0
+        self.draining = False
+
+    def wrap(self, app):
+        def drained(environ, start_response):
+            if environ["REQUEST_METHOD"] not in WRITE_METHODS:
+                return app(environ, start_response)
+            with self._cond:
+                if self.draining:
+                    self.rejected += 1
+                    return self._reject(start_response)
+                self.in_flight += 1
+            try:
+                return ClosingIterator(app(environ, start_response), self._done)
+            except BaseException:
+                self._done()
+                raise
+
+        return drained
+
+    def _reject(self, start_response):
+        body = json.dumps({"status": "error", "message": "Server in arresto: richiesta non accettata"}).encode()
+        start_response("503 SERVICE UNAVAILABLE", [
+            ("Content-Type", "application/json"), ("Content-Length", str(len(body))),
+            ("Retry-After", str(config.LANE_RETRY_AFTER)),
+        ])
+        return [body]
+
+    def _done(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def begin(self):
+        with self._cond:
+            self.draining = True
+
+    def wait(self, timeout):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.in_flight == 0, timeout)
+
+    def stats(self):
+        with self._cond:
+            return {"draining": self.draining, "in_flight": self.in_flight, "rejected": self.rejected}
+
+drain = Drain()
+
+class StreamSlots:
+    def __init__(self, limit):
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.open = 0
+        self.rejected = 0
+
+    def acquire(self):
+        with self._lock:
+            if self.open >= self.limit:
+                self.rejected += 1
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+    def hold(self, iterable):
+        return ClosingIterator(iterable, self.release)
+
+    def stats(self):
+        with self._lock:
+            return {"open": self.open, "limit": self.limit, "rejected": self.rejected}
+
+stream_slots = StreamSlots(config.SERVER_MAX_STREAMS)
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout = config.SERVER_KEEPALIVE
+
+def _run_waitress(app, host, port, stopped):
+    sockets = {}
+    server = waitress.create_server(app, map=sockets, host=host, port=port, threads=config.SERVER_THREADS,
+                                    channel_timeout=config.SERVER_KEEPALIVE, ident="APIM MT5")
+    logging.info(f"Server waitress in ascolto su {host}:{port} con {config.SERVER_THREADS} thread (massimo {config.SERVER_MAX_STREAMS} flussi)")
+    while not stopped.is_set():
+        server.asyncore.loop(timeout=0.5, map=sockets, count=1)
+
+    # Le risposte delle ultime richieste possono essere ancora nei buffer dei canali:
+    # il loop continua finche non sono state inviate.
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline and any(getattr(channel, "total_outbufs_len", 0) for channel in list(sockets.values())):
+        server.asyncore.loop(timeout=0.05, map=sockets, count=1)
+    server.close()
+    server.task_dispatcher.shutdown(timeout=1)
+
+def _run_werkzeug(app, host, port, stopped):
+    server = make_server(host, port, app, threaded=True, request_handler=KeepAliveHandler)
+    logging.warning(f"waitress non installato: server Werkzeug in ascolto su {host}:{port} (installare waitress per la produzione)")
+    threading.Thread(target=lambda: (stopped.wait(), server.shutdown()), name="server-stop", daemon=True).start()
+    server.serve_forever()
+    server.server_close()
+
+def serve(app, host=None, port=None):
+    host = host or config.SERVER_HOST
+    port = port or config.SERVER_PORT
+    stopped = threading.Event()
+
+    def finish():
+        if not drain.wait(config.SERVER_DRAIN_TIMEOUT):
+            logging.warning(f"{drain.in_flight} richieste ancora in corso dopo {config.SERVER_DRAIN_TIMEOUT} s: arresto forzato")
+        stopped.set()
+
+    def shutdown(signum, frame):
+        if drain.draining:
+            return
+        logging.info(f"Segnale {signal.Signals(signum).name} ricevuto: attesa di {drain.in_flight} richieste in corso")
+        drain.begin()
+        threading.Thread(target=finish, name="server-drain", daemon=True).start()
+
+    for name in ("SIGTERM", "SIGINT", "SIGBREAK"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), shutdown)
+
+    run = _run_waitress if waitress is not None else _run_werkzeug
+    run(drain.wrap(app), host, port, stopped)
+    logging.info("Server arrestato")
@@ -1,19 +1,37 @@
-from flask import Flask, request
-import MetaTrader5 as mt5
+from flask import Flask, Response, request
+from executor import executor, mt5
+from session import session
+from symbols import symbol_cache
+from snapshots import poller
+from push import STREAMS, broadcaster, sse
+from singleflight import flights
+import config
+from admission import ORDERS, SNAPSHOT, HISTORY, Held, LaneBusy, admit
+import admission
+import instrumentation
+import compression
+from logs import setup_logging
+import json
 import socket
+import threading
+from datetime import datetime, timezone
 import logging
 from flask_restx import Api, Resource, fields, reqparse
-from protocol import get_account_info, get_orders, get_history_deals_orders, get_history_orders, get_placed_orders, create_order, update_order, delete_order
+from serialization import ARROW, BINARY_FORMATS, FORMATS, NPY, RECORDS, pa, serialize_array, to_arrow, to_ndjson, to_npy
+from analytics import GROUP_KEYS, daily_pnl, get_analytics
+from market_data import TICK_FLAGS, TIMEFRAME_SECONDS, TIMEFRAMES, get_bars, get_ticks, parse_time, range_cache
+from serve import drain, serve, stream_slots
+from history_store import store
+from protocol import HistoryQuery, get_account_info, get_orders, get_history_deals_orders, get_history_orders, get_placed_orders, create_order, update_order, delete_order, iter_history_deals_orders, iter_history_orders, create_orders, update_orders, delete_orders, cancel_orders, close_positions
 
-logging.basicConfig(
-    filename="trading_api.log",
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+setup_logging()
 
 app = Flask(__name__)
 api = Api(app, version="1.0", title="APIM MT5", description="API per la gestione degli ordini su MetaTrader5")
+instrumentation.install(app, api)
+compression.install(app)
+
+services_started = threading.Event()
 
 error_model = api.model('Error', {
     'status': fields.String(description='Stato della risposta'),
@@ -42,40 +60,139 @@ update_model = api.model('UpdateOrder', {
     'stop_loss': fields.Float(description='Nuovo livello Stop Loss'),
 })
 
+batch_order_model = api.model('OrderBatch', {
+    'orders': fields.List(fields.Nested(order_model), required=True, description='Ordini da inviare'),
+    'mode': fields.String(description='best_effort (default) o fail_fast'),
+})
+
+batch_update_model = api.model('UpdateOrderBatch', {
+    'orders': fields.List(fields.Nested(update_model), required=True, description='Ordini da aggiornare'),
+    'mode': fields.String(description='best_effort (default) o fail_fast'),
+})
+
+batch_delete_model = api.model('DeleteOrderBatch', {
+    'tickets': fields.List(fields.Integer, required=True, description='ID degli ordini da cancellare'),
+    'mode': fields.String(description='best_effort (default) o fail_fast'),
+})
+
 history_model = api.model('HistoryRequest', {
     'status': fields.String(required=True, description='Data di inizio (formato: YYYY-MM-DD HH:MM:SS)'),
     'from_date': fields.String(required=True, description='Data di inizio (formato: YYYY-MM-DD HH:MM:SS)'),
     'to_date': fields.String(description='Data di fine (formato: YYYY-MM-DD HH:MM:SS)'),
 })
 
+@app.after_request
+def forget_coalesced_reads(response):
+    if request.method in ['POST', 'PUT', 'DELETE'] and request.path.startswith(('/orders', '/positions')):
+        flights.forget()
+        poller.invalidate()
+    return response
+
+def coalesce(key, fetch, ttl, lane):
+    def admitted():
+        with admit(lane):
+            return fetch()
+
+    return flights.do(key, admitted, ttl, cache_if=lambda result: result.success)
+
+def snapshot_response(snapshot):
+    headers = {"ETag": f'"{snapshot.etag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    for etag in compression.etag_variants(snapshot.etag):
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=dict(headers, ETag=f'"{etag}"'))
+    return Response(snapshot.body, mimetype='application/json', headers=headers)
+
+def wants_stream():
+    return request.args.get('stream') in ['1', 'true'] or 'application/x-ndjson' in request.headers.get('Accept', '')
+
+def history_query():
+    symbol = request.args.get('symbol')
+    group = request.args.get('group')
+    if symbol and group:
+        raise ValueError("Indicare symbol oppure group, non entrambi")
+    numbers = {}
+    for name in ('position_id', 'ticket', 'magic'):
+        value = request.args.get(name)
+        if value:
+            if not value.lstrip('-').isdigit():
+                raise ValueError(f"Parametro {name} non valido")
+            numbers[name] = int(value)
+    query = HistoryQuery(symbol or group or None, numbers.get('position_id'), numbers.get('ticket'), numbers.get('magic'))
+    fields = tuple(f.strip() for f in request.args.get('fields', '').split(',') if f.strip()) or None
+    return query, fields
+
+def open_stream(body, **settings):
+    if not stream_slots.acquire():
+        message = f"Troppi flussi aperti (massimo {stream_slots.limit}): riprovare piu tardi"
+        return {"status": "error", "message": message},503,{"Retry-After": str(config.LANE_RETRY_AFTER)}
+    try:
+        return Response(stream_slots.hold(body()), **settings)
+    except BaseException:
+        stream_slots.release()
+        raise
+
+def stream_history(status, from_date, to_date, query, fields):
+    iterate = iter_history_orders if status == 'history' else iter_history_deals_orders
+    chunks = iterate(from_date, to_date, query, fields)
+
+    def generate():
+        try:
+            yield from to_ndjson(chunks)
+        except Exception as e:
+            logging.exception(f"Errore nello streaming della cronologia {status}")
+            yield json.dumps({"status": "error", "message": str(e)}) + "\n"
+
+    return open_stream(lambda: Held(HISTORY, generate()), mimetype='application/x-ndjson')
+
+def error_response(result, **extra):
+    body = dict({"status": "error", "message": result.message}, **extra)
+    if result.outcome is not None:
+        body["outcome"] = result.outcome
+    return body,result.status
+
+def bulk_filter():
+    symbol = request.args.get('symbol') or None
+    magic = request.args.get('magic') or None
+    if magic is not None:
+        if not magic.lstrip('-').isdigit():
+            raise ValueError("Parametro magic non valido")
+        magic = int(magic)
+    if symbol is None and magic is None and request.args.get('all') not in ['1', 'true']:
+        raise ValueError("Indicare symbol e/o magic, oppure all=1 per includere tutto")
+    return symbol, magic
+
+bulk_doc = {
+    'symbol': {'description': 'Solo gli elementi del simbolo indicato', 'type': 'string', 'required': False},
+    'magic': {'description': 'Solo gli elementi con il magic number indicato', 'type': 'integer', 'required': False},
+    'all': {'description': '1 per includere tutto quando symbol e magic sono assenti', 'type': 'string', 'required': False},
+}
+
 @api.route('/orders')
 class Orders(Resource):
     @api.expect(order_model)
     def post(self):
         try:
-            if not mt5.initialize():
-                return {"success": False, "message": f"Errore inizializzazione MT5: {mt5.last_error()}"},501
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
             
-            data = request.get_json()
-            symbol = data['symbol']
-            order_type = data['type']
-            volume = data['volume']
-            
-            if order_type in ['buy', 'sell']:
-                order_result = create_order(symbol, order_type, volume)
-            else:
-                price = data.get('price')
-                take_profit = data.get('take_profit')
-                stop_loss = data.get('stop_loss')
-                order_result = create_order(symbol, order_type, volume, price, stop_loss, take_profit)
+                data = request.get_json()
+                symbol = data['symbol']
+                order_type = data['type']
+                volume = data['volume']
             
-            response = order_result[0] if isinstance(order_result, tuple) else order_result
-            data = response.get_json()
+                if order_type in ['buy', 'sell']:
+                    result = create_order(symbol, order_type, volume)
+                else:
+                    price = data.get('price')
+                    take_profit = data.get('take_profit')
+                    stop_loss = data.get('stop_loss')
+                    result = create_order(symbol, order_type, volume, price, stop_loss, take_profit)
 
-            if data["success"]:
-                return {"status": "success", "order_id": data["order"]},200
-            else:
-                return {"status": "error", "message": data["message"]},500
+                if result.success:
+                    return {"status": "success", "order_id": result.payload, "attempts": result.attempts},200
+                else:
+                    return error_response(result, attempts=result.attempts)
         except Exception as e:
             logging.exception("Errore nella creazione dell'ordine")
             return {"status": "error", "message": str(e)}
@@ -83,23 +200,22 @@ class Orders(Resource):
     @api.expect(update_model)
     def put(self):
         try:
-            if not mt5.initialize():
-                return {"success": False, "message": f"Errore inizializzazione MT5: {mt5.last_error()}"},501
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
             
-            data = request.get_json()
-            order_ticket = data['ticket']
-            price = data.get('price') or None
-            take_profit = data.get('take_profit') or None
-            stop_loss = data.get('stop_loss') or None
+                data = request.get_json()
+                order_ticket = data['ticket']
+                price = data.get('price') or None
+                take_profit = data.get('take_profit') or None
+                stop_loss = data.get('stop_loss') or None
             
-            update_result = update_order(order_ticket, price, stop_loss, take_profit)
-            response = update_result[0] if isinstance(update_result, tuple) else update_result
-            data = response.get_json()
+                result = update_order(order_ticket, price, stop_loss, take_profit)
 
-            if data["success"]:
-                return {"status": "success", "message": data["message"]},200
-            else:
-                return {"status": "error", "message": data["message"]},500
+                if result.success:
+                    return {"status": "success", "message": result.message},200
+                else:
+                    return error_response(result)
         except Exception as e:
             logging.exception("Errore nell'aggiornamento dell'ordine")
             return {"status": "error", "message": str(e)},500
@@ -107,22 +223,29 @@ class Orders(Resource):
     @api.expect(api.model('DeleteRequest', {
         'ticket': fields.Integer(required=True, description='ID dell\'ordine da cancellare'),
     }))
+    @api.doc(params=bulk_doc)
     def delete(self):
         try:
-            if not mt5.initialize():
-                return {"success": False, "message": f"Errore inizializzazione MT5: {mt5.last_error()}"},501
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+
+                if any(name in request.args for name in ('symbol', 'magic', 'all')):
+                    try:
+                        symbol, magic = bulk_filter()
+                    except ValueError as e:
+                        return {"status": "error", "message": str(e)},400
+                    return batch_response(cancel_orders(symbol, magic))
             
-            data = request.get_json()
-            order_ticket = data['ticket']
+                data = request.get_json()
+                order_ticket = data['ticket']
             
-            delete_result = delete_order(order_ticket)
-            response = delete_result[0] if isinstance(delete_result, tuple) else delete_result
-            data = response.get_json()
+                result = delete_order(order_ticket)
 
-            if data["success"]:
-                return {"status": "success", "message": data["message"]},200
-            else:
-                return {"status": "error", "message": data["message"]},500
+                if result.success:
+                    return {"status": "success", "message": result.message},200
+                else:
+                    return error_response(result)
         except Exception as e:
             logging.exception("Errore nella cancellazione dell'ordine")
             return {"status": "error", "message": str(e)},500
@@ -142,57 +265,202 @@ class Orders(Resource):
             'description': 'Data di fine per gli stati history e historyDeals (formato DD/MM/YYYY)',
             'type': 'string',
             'required': False
+        },
+        'format': {
+            'description': 'Formato della lista: records (default), rows (fields + righe come array), columnar (un array per campo)',
+            'type': 'string',
+            'required': False
+        },
+        'stream': {
+            'description': 'Per history e historyDeals: 1 per ricevere i record in streaming NDJSON (equivale a Accept: application/x-ndjson)',
+            'type': 'string',
+            'required': False
+        },
+        'symbol': {
+            'description': 'Per history e historyDeals: solo il simbolo indicato',
+            'type': 'string',
+            'required': False
+        },
+        'group': {
+            'description': 'Per history e historyDeals: filtro simboli del terminale (es. *USD*,!EUR*)',
+            'type': 'string',
+            'required': False
+        },
+        'position_id': {
+            'description': 'Per history e historyDeals: solo la posizione indicata (from_date e to_date diventano facoltativi)',
+            'type': 'integer',
+            'required': False
+        },
+        'ticket': {
+            'description': 'Per history: ticket dell\'ordine; per historyDeals: ticket dell\'ordine che ha generato i deal (from_date e to_date diventano facoltativi)',
+            'type': 'integer',
+            'required': False
+        },
+        'magic': {
+            'description': 'Per history e historyDeals: solo gli ordini con il magic number indicato',
+            'type': 'integer',
+            'required': False
+        },
+        'fields': {
+            'description': 'Per history e historyDeals: campi da restituire separati da virgola (es. ticket,time,profit)',
+            'type': 'string',
+            'required': False
         }
     })
     @api.response(400, 'Status non valido', model=error_model)
     def get(self):
         try:
-            if not mt5.initialize():
-                return {"success": False, "message": f"Errore inizializzazione MT5: {mt5.last_error()}"},501
-            
             status = request.args.get('status')
+            lane = HISTORY if status in ['history', 'historyDeals'] else SNAPSHOT
+            if lane == HISTORY:
+                try:
+                    query, fields = history_query()
+                except ValueError as e:
+                    return {"status": "error", "message": str(e)},400
+                if wants_stream():
+                    if not session.ensure():
+                        return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+                    try:
+                        return stream_history(status, request.args.get('from_date'), request.args.get('to_date'), query, fields)
+                    except ValueError as e:
+                        return {"status": "error", "message": str(e)},400
+
+            if not session.ensure():
+                return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+
+            fmt = request.args.get('format', RECORDS)
+            if fmt not in FORMATS:
+                return {"status": "error", "message": f"Formato non valido. Valori validi: {', '.join(FORMATS)}"},400
+
+            snapshot = poller.get(status) if status in ['active', 'placed'] and fmt == RECORDS else None
+            if snapshot is not None:
+                return snapshot_response(snapshot)
 
             if status == 'active':
-                get_status_order_result = get_orders()
+                result = coalesce((status, fmt), lambda: get_orders(fmt), config.COALESCE_TTL_SNAPSHOT, lane)
             elif status == 'placed':     
-                get_status_order_result = get_placed_orders()
+                result = coalesce((status, fmt), lambda: get_placed_orders(fmt), config.COALESCE_TTL_SNAPSHOT, lane)
             elif status == 'history':
                 from_date = request.args.get('from_date')
                 to_date = request.args.get('to_date')  
-                get_status_order_result = get_history_orders(from_date, to_date)
+                result = coalesce((status, from_date, to_date, fmt, query, fields),
+                                  lambda: get_history_orders(from_date, to_date, fmt, query, fields),
+                                  config.COALESCE_TTL_HISTORY, lane)
             elif status == 'historyDeals':     
                 from_date = request.args.get('from_date')
                 to_date = request.args.get('to_date')  
-                get_status_order_result = get_history_deals_orders(from_date, to_date)
+                result = coalesce((status, from_date, to_date, fmt, query, fields),
+                                  lambda: get_history_deals_orders(from_date, to_date, fmt, query, fields),
+                                  config.COALESCE_TTL_HISTORY, lane)
             else:
                 return {"status": "error", "message": "Status non valido"}
-            
-            response = get_status_order_result[0] if isinstance(get_status_order_result, tuple) else get_status_order_result
-            data = response.get_json()
-        
-            if data["success"]:
-                return {"status": "success", "orders": data["orders"]},200
+
+            if result.success:
+                return {"status": "success", "orders": result.payload},200
             else:
-                return {"status": "error", "message":  data["message"]},500
+                return {"status": "error", "message": result.message},result.status
+        except LaneBusy as e:
+            return {"status": "error", "message": str(e)},429,{"Retry-After": str(e.retry_after)}
         except Exception as e:
             logging.exception("Errore nella ricezione della lista degli ordini {status}")
             return {"status": "error", "message": str(e)},500
 
+def batch_items(data, key):
+    items = (data or {}).get(key)
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"Il campo '{key}' deve essere una lista non vuota")
+    mode = (data or {}).get('mode', 'best_effort')
+    if mode not in ['best_effort', 'fail_fast']:
+        raise ValueError("Il campo 'mode' deve essere best_effort o fail_fast")
+    return items, mode == 'fail_fast'
+
+def batch_response(result):
+    if not result.success:
+        return {"status": "error", "message": result.message},result.status
+    status = "success" if result.payload["failed"] == 0 else "partial"
+    return dict({"status": status}, **result.payload),200
+
+@api.route('/orders/batch')
+class OrdersBatch(Resource):
+    @api.expect(batch_order_model)
+    def post(self):
+        try:
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+                try:
+                    specs, fail_fast = batch_items(request.get_json(), 'orders')
+                except ValueError as e:
+                    return {"status": "error", "message": str(e)},400
+                return batch_response(create_orders(specs, fail_fast))
+        except Exception as e:
+            logging.exception("Errore nella creazione del batch di ordini")
+            return {"status": "error", "message": str(e)},500
+
+    @api.expect(batch_update_model)
+    def put(self):
+        try:
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+                try:
+                    updates, fail_fast = batch_items(request.get_json(), 'orders')
+                except ValueError as e:
+                    return {"status": "error", "message": str(e)},400
+                return batch_response(update_orders(updates, fail_fast))
+        except Exception as e:
+            logging.exception("Errore nell'aggiornamento del batch di ordini")
+            return {"status": "error", "message": str(e)},500
+
+    @api.expect(batch_delete_model)
+    def delete(self):
+        try:
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+                try:
+                    tickets, fail_fast = batch_items(request.get_json(), 'tickets')
+                except ValueError as e:
+                    return {"status": "error", "message": str(e)},400
+                return batch_response(delete_orders(tickets, fail_fast))
+        except Exception as e:
+            logging.exception("Errore nella cancellazione del batch di ordini")
+            return {"status": "error", "message": str(e)},500
+
+@api.route('/positions/close')
+class ClosePositions(Resource):
+    @api.doc(params=bulk_doc)
+    def post(self):
+        try:
+            with admit(ORDERS):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+                try:
+                    symbol, magic = bulk_filter()
+                except ValueError as e:
+                    return {"status": "error", "message": str(e)},400
+                return batch_response(close_positions(symbol, magic))
+        except Exception as e:
+            logging.exception("Errore nella chiusura delle posizioni")
+            return {"status": "error", "message": str(e)},500
+
 @api.route('/account')
 class AccountInfo(Resource):
     def get(self):
         try:
-            if not mt5.initialize():
-                return {"success": False, "message": f"Errore inizializzazione MT5: {mt5.last_error()}"},501
+            if not session.ensure():
+                return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
 
-            getInfo_result = get_account_info()
-            response = getInfo_result[0] if isinstance(getInfo_result, tuple) else getInfo_result
-            data = response.get_json()
-        
-            if data["success"]:
-                return {"status": "success", "info": data["info"]},200
+            snapshot = poller.get('account')
+            if snapshot is not None:
+                return snapshot_response(snapshot)
+
+            result = coalesce(('account',), get_account_info, config.COALESCE_TTL_SNAPSHOT, SNAPSHOT)
+
+            if result.success:
+                return {"status": "success", "info": result.payload},200
             else:
-                return {"status": "error", "message":  data["message"]},500
+                return {"status": "error", "message": result.message},result.status
         except Exception as e:
             logging.exception("Errore nella ricezione delle informazioni dell' account")
             return {"status": "error", "message": str(e)},500
@@ -200,41 +468,264 @@ class AccountInfo(Resource):
     @api.expect(login_model)
     def post(self):
         try:
-            data = request.get_json()
-            username = data['username']
-            password = data['password']
-            serverName = data['serverName']
+            with admit(SNAPSHOT):
+                data = request.get_json()
+                username = data['username']
+                password = data['password']
+                serverName = data['serverName']
 
-            if not mt5.initialize(login=int(username), server=serverName, password=password):
-                return {"success": False, "message": f"Errore Connessione Account MT5: {mt5.last_error()}"},501
+                if not session.connect(login=username, password=password, server=serverName):
+                    return {"success": False, "message": f"Errore Connessione Account MT5: {session.last_error}"},501
+                bind_history_store(username)
+                symbol_cache.invalidate()
+                range_cache.clear()
+                daily_pnl.clear()
+                poller.invalidate()
+                flights.forget()
             
-            getInfo_result = get_account_info()
-            response = getInfo_result[0] if isinstance(getInfo_result, tuple) else getInfo_result
-            data = response.get_json()
+                result = get_account_info()
         
-            if data["success"]:
-                return {"status": "success", "info": data["info"]},200
-            else:
-                return {"status": "error", "message":  data["message"]},500
+                if result.success:
+                    return {"status": "success", "info": result.payload},200
+                else:
+                    return {"status": "error", "message": result.message},result.status
         except Exception as e:
             logging.exception("Errore nella ricezione delle informazioni dell' account")
             return {"status": "error", "message": str(e)},500
     def delete(self):
         try:
-            if not mt5.initialize():
-                return {"success": False, "message": f"Errore inizializzazione MT5: {mt5.last_error()}"},501
-            if not mt5.shutdown():
-                return {"success": False, "message": f"Errore Disconnessione Account MT5: {mt5.last_error()}"},500
+            with admit(SNAPSHOT):
+                if not session.ensure():
+                    return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+                poller.invalidate()
+                flights.forget()
+                session.shutdown()
             
-            return {"status": "success", "info": "Account Disconnesso con Successo"},200
+                return {"status": "success", "info": "Account Disconnesso con Successo"},200
         
         except Exception as e:
             logging.exception("Errore nella disconnessione dell' account")
             return {"status": "error", "message": str(e)},500
 
+@api.route('/stream')
+class Stream(Resource):
+    @api.doc(params={
+        'symbols': {'description': 'Simboli separati da virgola (tutti se assente; per i tick valgono WARM_SYMBOLS)', 'type': 'string', 'required': False},
+        'streams': {'description': f"Flussi separati da virgola: {', '.join(STREAMS)} (tutti se assente)", 'type': 'string', 'required': False},
+    })
+    def get(self):
+        symbols = {s.strip() for s in request.args.get('symbols', '').split(',') if s.strip()}
+        streams = {s.strip() for s in request.args.get('streams', ','.join(STREAMS)).split(',') if s.strip()}
+        unknown = streams - set(STREAMS)
+        if unknown:
+            return {"status": "error", "message": f"Flussi non validi: {', '.join(sorted(unknown))}"},400
+
+        return open_stream(lambda: sse(broadcaster.subscribe(symbols, streams), broadcaster), mimetype='text/event-stream',
+                           headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def market_data_params():
+    symbol = request.args.get('symbol')
+    if not symbol:
+        raise ValueError("Parametro symbol obbligatorio")
+    fmt = request.args.get('format', RECORDS)
+    if fmt not in FORMATS + BINARY_FORMATS:
+        raise ValueError(f"Formato non valido. Valori validi: {', '.join(FORMATS + BINARY_FORMATS)}")
+    if fmt == ARROW and pa is None:
+        raise ValueError("Formato arrow non disponibile: installare pyarrow")
+    count = int(request.args['count']) if request.args.get('count') else None
+    if count is not None and count <= 0:
+        raise ValueError("Il parametro count deve essere positivo")
+    date_from = parse_time(request.args['from_date']) if request.args.get('from_date') else None
+    date_to = parse_time(request.args['to_date']) if request.args.get('to_date') else None
+    resample = request.args.get('resample')
+    if resample is not None and resample not in TIMEFRAME_SECONDS:
+        raise ValueError(f"Resample non valido. Valori validi: {', '.join(TIMEFRAME_SECONDS)}")
+    return symbol, fmt, date_from, date_to, count, resample
+
+def array_response(result, key, fmt, filename):
+    if not result.success:
+        return {"status": "error", "message": result.message},result.status
+    if fmt == NPY:
+        size, chunks = to_npy(result.payload)
+        return Response(chunks, mimetype='application/octet-stream',
+                        headers={"Content-Length": str(size), "Content-Disposition": f'attachment; filename="{filename}.npy"'})
+    if fmt == ARROW:
+        size, chunks = to_arrow(result.payload)
+        return Response(chunks, mimetype='application/vnd.apache.arrow.stream',
+                        headers={"Content-Length": str(size), "Content-Disposition": f'attachment; filename="{filename}.arrows"'})
+    return {"status": "success", key: serialize_array(result.payload, fmt)},200
+
+market_data_doc = {
+    'symbol': {'description': 'Simbolo (es. EURUSD)', 'type': 'string', 'required': True},
+    'from_date': {'description': 'Inizio intervallo (DD/MM/YYYY[ HH:MM[:SS]] o timestamp Unix, UTC)', 'type': 'string', 'required': False},
+    'to_date': {'description': 'Fine intervallo (default: adesso)', 'type': 'string', 'required': False},
+    'count': {'description': 'Numero di elementi da restituire al posto di to_date', 'type': 'integer', 'required': False},
+    'resample': {'description': f"Timeframe di ricampionamento lato server: {', '.join(TIMEFRAME_SECONDS)}", 'type': 'string', 'required': False},
+    'format': {'description': f"Formato: {', '.join(FORMATS)} (JSON) o {', '.join(BINARY_FORMATS)} (binario)", 'type': 'string', 'required': False},
+}
+
+@api.route('/bars')
+class Bars(Resource):
+    @api.doc(params=dict(market_data_doc, **{
+        'timeframe': {'description': f"Timeframe: {', '.join(TIMEFRAMES)} (default M1)", 'type': 'string', 'required': False},
+        'start': {'description': 'Con count e senza from_date: posizione della prima barra (0 = barra corrente)', 'type': 'integer', 'required': False},
+    }))
+    def get(self):
+        try:
+            symbol, fmt, date_from, date_to, count, resample = market_data_params()
+            timeframe = request.args.get('timeframe', 'M1')
+            if timeframe not in TIMEFRAMES:
+                raise ValueError(f"Timeframe non valido. Valori validi: {', '.join(TIMEFRAMES)}")
+            if resample is not None and (timeframe not in TIMEFRAME_SECONDS
+                                         or TIMEFRAME_SECONDS[resample] <= TIMEFRAME_SECONDS[timeframe]
+                                         or TIMEFRAME_SECONDS[resample] % TIMEFRAME_SECONDS[timeframe]):
+                raise ValueError(f"Impossibile ricampionare {timeframe} in {resample}")
+            if date_from is None and count is None:
+                raise ValueError("Indicare from_date oppure count")
+            start = int(request.args.get('start', 0))
+        except ValueError as e:
+            return {"status": "error", "message": str(e)},400
+
+        try:
+            if not session.ensure():
+                return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+            with admit(HISTORY):
+                if date_from is None:
+                    result = get_bars(symbol, timeframe, count=count, start=start, resample=resample)
+                else:
+                    result = get_bars(symbol, timeframe, date_from, date_to or datetime.now(timezone.utc), resample=resample)
+            return array_response(result, 'rates', fmt, f"{symbol}-{resample or timeframe}")
+        except LaneBusy as e:
+            return {"status": "error", "message": str(e)},429,{"Retry-After": str(e.retry_after)}
+        except Exception as e:
+            logging.exception("Errore nella ricezione delle barre")
+            return {"status": "error", "message": str(e)},500
+
+@api.route('/ticks')
+class Ticks(Resource):
+    @api.doc(params=dict(market_data_doc, **{
+        'flags': {'description': f"Tick da copiare: {', '.join(TICK_FLAGS)} (default all)", 'type': 'string', 'required': False},
+    }))
+    def get(self):
+        try:
+            symbol, fmt, date_from, date_to, count, resample = market_data_params()
+            flags = request.args.get('flags', 'all')
+            if flags not in TICK_FLAGS:
+                raise ValueError(f"Flags non valido. Valori validi: {', '.join(TICK_FLAGS)}")
+            if date_from is None:
+                raise ValueError("Parametro from_date obbligatorio")
+        except ValueError as e:
+            return {"status": "error", "message": str(e)},400
+
+        try:
+            if not session.ensure():
+                return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+            with admit(HISTORY):
+                if count is not None:
+                    result = get_ticks(symbol, date_from, count=count, flags=flags, resample=resample)
+                else:
+                    result = get_ticks(symbol, date_from, date_to or datetime.now(timezone.utc), flags=flags, resample=resample)
+            return array_response(result, 'rates' if resample else 'ticks', fmt, f"{symbol}-{resample or 'ticks'}")
+        except LaneBusy as e:
+            return {"status": "error", "message": str(e)},429,{"Retry-After": str(e.retry_after)}
+        except Exception as e:
+            logging.exception("Errore nella ricezione dei tick")
+            return {"status": "error", "message": str(e)},500
+
+@api.route('/analytics')
+class Analytics(Resource):
+    @api.doc(params={
+        'from_date': {'description': 'Primo giorno (DD/MM/YYYY, UTC)', 'type': 'string', 'required': True},
+        'to_date': {'description': 'Ultimo giorno incluso (default: oggi)', 'type': 'string', 'required': False},
+        'group_by': {'description': f"Chiavi di aggregazione separate da virgola: {', '.join(GROUP_KEYS)} (default tutte)", 'type': 'string', 'required': False},
+        'exposure': {'description': 'Includere l\'esposizione delle posizioni aperte (default 1)', 'type': 'string', 'required': False},
+        'format': {'description': f"Formato: {', '.join(FORMATS)}", 'type': 'string', 'required': False},
+    })
+    def get(self):
+        try:
+            if not request.args.get('from_date'):
+                raise ValueError("Parametro from_date obbligatorio")
+            from_date = parse_time(request.args['from_date'])
+            to_date = parse_time(request.args['to_date']) if request.args.get('to_date') else datetime.now(timezone.utc)
+            keys = tuple(k.strip() for k in request.args.get('group_by', ','.join(GROUP_KEYS)).split(',') if k.strip())
+            unknown = set(keys) - set(GROUP_KEYS)
+            if unknown:
+                raise ValueError(f"Chiavi di aggregazione non valide: {', '.join(sorted(unknown))}. Valori validi: {', '.join(GROUP_KEYS)}")
+            keys = tuple(k for k in GROUP_KEYS if k in keys)
+            fmt = request.args.get('format', RECORDS)
+            if fmt not in FORMATS:
+                raise ValueError(f"Formato non valido. Valori validi: {', '.join(FORMATS)}")
+            with_exposure = request.args.get('exposure', '1') not in ['0', 'false']
+        except ValueError as e:
+            return {"status": "error", "message": str(e)},400
+
+        try:
+            if not session.ensure():
+                return {"success": False, "message": f"Errore inizializzazione MT5: {session.last_error}"},501
+            result = coalesce(('analytics', from_date, to_date.date(), keys, fmt, with_exposure),
+                              lambda: get_analytics(from_date, to_date, keys, fmt, with_exposure),
+                              config.COALESCE_TTL_HISTORY, HISTORY)
+            if result.success:
+                return dict({"status": "success"}, **result.payload),200
+            else:
+                return {"status": "error", "message": result.message},result.status
+        except LaneBusy as e:
+            return {"status": "error", "message": str(e)},429,{"Retry-After": str(e.retry_after)}
+        except Exception as e:
+            logging.exception("Errore nel calcolo delle analisi")
+            return {"status": "error", "message": str(e)},500
+
+@api.route('/symbols')
+class Symbols(Resource):
+    def get(self):
+        return {"status": "success", "symbols": symbol_cache.snapshot()},200
+
+    @api.doc(params={'symbol': {'description': 'Simbolo da invalidare (tutti se assente)', 'type': 'string', 'required': False}})
+    def delete(self):
+        symbol_cache.invalidate(request.args.get('symbol'))
+        return {"status": "success", "message": "Cache simboli invalidata"},200
+
+@api.route('/executor')
+class ExecutorStats(Resource):
+    def get(self):
+        return {"status": "success", "executor": executor.stats(), "lanes": admission.stats(), "coalescing": flights.stats(), "market_data": range_cache.stats(), "analytics": daily_pnl.stats(), "server": drain.stats(), "streams": stream_slots.stats()},200
+
+@app.route('/healthz')
+def healthz():
+    return {"status": "ok"},200
+
+@app.route('/readyz')
+def readyz():
+    checks = {"started": services_started.is_set(), "mt5_connected": session.connected, "draining": drain.draining}
+    ready = checks["started"] and checks["mt5_connected"] and not checks["draining"]
+    return dict({"status": "ready" if ready else "not_ready"}, **checks),200 if ready else 503
+
+def bind_history_store(login=None):
+    if store is None:
+        return
+    if login is None:
+        info = mt5.account_info()
+        if info is None:
+            logging.warning(f"Conto non disponibile, store dello storico non verificato: {mt5.last_error()}")
+            return
+        login = info.login
+    store.bind(login)
+
+def start_services(login=None, password=None, server=None):
+    broadcaster.start()
+    if session.start(login, password, server):
+        bind_history_store(login)
+        symbol_cache.warm(config.WARM_SYMBOLS)
+        if config.SNAPSHOT_INTERVAL > 0:
+            poller.poll()
+    poller.start()
+    services_started.set()
+    logging.info("Servizi avviati: simboli e snapshot pronti")
+
 if __name__ == '__main__':
     hostname = socket.gethostname()
     ip_address = socket.gethostbyname(hostname)
     print(f"Server in esecuzione su IP: {ip_address}")
     logging.info(f"Server in esecuzione su IP: {ip_address}")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    threading.Thread(target=start_services, name="warm-up", daemon=True).start()
+    serve(app, config.SERVER_HOST, config.SERVER_PORT)
@@ -0,0 +1,93 @@
+from executor import mt5
+import logging
+import threading
+import time
+import config
+
+class MT5Session:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._connected = False
+        self._credentials = None
+        self._last_check = 0.0
+        self._backoff = config.MT5_RECONNECT_BACKOFF
+        self._next_attempt = 0.0
+        self.initialize_count = 0
+        self.reconnect_count = 0
+        self.last_error = None
+
+    @property
+    def connected(self):
+        return self._connected
+
+    def _initialize(self, credentials):
+        self.initialize_count += 1
+        kwargs = dict(credentials or {})
+        if config.MT5_PATH:
+            return mt5.initialize(config.MT5_PATH, **kwargs)
+        return mt5.initialize(**kwargs)
+
+    def connect(self, login=None, password=None, server=None):
+        with self._lock:
+            if login is not None:
+                credentials = {"login": int(login), "password": password, "server": server}
+            else:
+                credentials = self._credentials
+
+            if not self._initialize(credentials):
+                self.last_error = mt5.last_error()
+                self._connected = False
+                logging.error(f"Errore inizializzazione MT5: {self.last_error}")
+                return False
+
+            self._credentials = credentials
+            self._connected = True
+            self._last_check = time.monotonic()
+            self._backoff = config.MT5_RECONNECT_BACKOFF
+            self._next_attempt = 0.0
+            return True
+
+    def start(self, login=None, password=None, server=None):
+        if login is not None:
+            with self._lock:
+                self._credentials = {"login": int(login), "password": password, "server": server}
+        for attempt in range(config.MT5_STARTUP_ATTEMPTS):
+            if self.connect():
+                logging.info("Sessione MT5 avviata")
+                return True
+            time.sleep(min(config.MT5_RECONNECT_BACKOFF * 2 ** attempt, config.MT5_RECONNECT_BACKOFF_MAX))
+        return False
+
+    def ensure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._connected:
+                if now - self._last_check < config.MT5_HEALTH_INTERVAL:
+                    return True
+                if mt5.terminal_info() is not None:
+                    self._last_check = now
+                    return True
+                self.last_error = mt5.last_error()
+                self._connected = False
+                logging.warning(f"Connessione al terminale MT5 persa: {self.last_error}")
+
+            if now < self._next_attempt:
+                return False
+
+            self.reconnect_count += 1
+            if self.connect():
+                logging.info("Riconnessione al terminale MT5 riuscita")
+                return True
+
+            self._next_attempt = now + self._backoff
+            self._backoff = min(self._backoff * 2, config.MT5_RECONNECT_BACKOFF_MAX)
+            return False
+
+    def shutdown(self):
+        with self._lock:
+            self._connected = False
+            self._credentials = None
+            # mt5.shutdown() restituisce sempre None: non c'e un esito da controllare.
+            mt5.shutdown()
+
+session = MT5Session()
@@ -0,0 +1,74 @@
+import config
+import threading
+import time
+from concurrent.futures import Future
+
+class SingleFlight:
+    def __init__(self, max_results=256):
+        self._max_results = max_results
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.cached = 0
+
+    def do(self, key, fn, ttl=0.0, cache_if=None):
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    self.cached += 1
+                    return cached[1]
+                del self._results[key]
+
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._calls[key]
+            if ttl > 0 and (cache_if is None or cache_if(value)):
+                self._store(key, value, ttl)
+        future.set_result(value)
+        return value
+
+    def _store(self, key, value, ttl):
+        # Le chiavi scadute non richieste di nuovo resterebbero in memoria: vengono rimosse a ogni
+        # inserimento e, oltre max_results, si scartano le piu vecchie.
+        now = time.monotonic()
+        for expired in [k for k, (expires, _) in self._results.items() if expires <= now]:
+            del self._results[expired]
+        self._results.pop(key, None)
+        while self._results and len(self._results) >= self._max_results:
+            del self._results[next(iter(self._results))]
+        self._results[key] = (now + ttl, value)
+
+    def forget(self, key=None):
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "cached": self.cached,
+                    "in_flight": len(self._calls), "results": len(self._results)}
+
+flights = SingleFlight(config.COALESCE_MAX_RESULTS)
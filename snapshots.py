@@ -0,0 +1,102 @@
+import admission
+import config
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from protocol import get_account_info, get_orders, get_placed_orders
+from session import session
+
+Snapshot = namedtuple("Snapshot", ["payload", "body", "etag", "changed", "checked"])
+
+SOURCES = {
+    "active": (get_orders, "orders"),
+    "placed": (get_placed_orders, "orders"),
+    "account": (get_account_info, "info"),
+}
+
+class SnapshotPoller:
+    def __init__(self, interval, max_age):
+        self._interval = interval
+        self._max_age = max_age
+        self._snapshots = {}
+        self._generation = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._interval <= 0 or self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.poll()
+            except Exception:
+                logging.exception("Errore nell'aggiornamento degli snapshot")
+            self._stop.wait(max(0.0, self._interval - (time.monotonic() - started)))
+
+    def poll(self):
+        if not session.ensure():
+            return
+        with admission.priority(admission.SNAPSHOT):
+            for name, (fetch, key) in SOURCES.items():
+                generation = self._generation
+                result = fetch()
+                # Una lettura iniziata prima di un invalidate puo non contenere l'ultimo ordine:
+                # non viene salvata e il prossimo giro rilegge il terminale.
+                if result.success and generation == self._generation:
+                    self._publish(name, key, result.payload)
+
+    def _publish(self, name, key, payload):
+        body = json.dumps({"status": "success", key: payload}, sort_keys=True)
+        etag = hashlib.sha1(body.encode()).hexdigest()[:20]
+        now = time.monotonic()
+        previous = self._snapshots.get(name)
+
+        if previous is not None and previous.etag == etag:
+            self._snapshots[name] = previous._replace(checked=now)
+            return
+
+        self._snapshots[name] = Snapshot(payload, body, etag, now, now)
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(name, payload)
+            except Exception:
+                logging.exception(f"Errore nella notifica dello snapshot {name}")
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshots = {}
+
+    def latest(self, name):
+        return self._snapshots.get(name)
+
+    def get(self, name):
+        snapshot = self._snapshots.get(name)
+        if snapshot is None or not self.running or time.monotonic() - snapshot.checked > self._max_age:
+            return None
+        return snapshot
+
+poller = SnapshotPoller(config.SNAPSHOT_INTERVAL, config.SNAPSHOT_MAX_AGE)
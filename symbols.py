@@ -0,0 +1,94 @@
+from executor import mt5
+import config
+import logging
+import threading
+import time
+from collections import namedtuple
+
+SymbolMeta = namedtuple("SymbolMeta", [
+    "name", "visible", "point", "digits", "trade_stops_level", "filling_mode",
+    "volume_min", "volume_max", "volume_step",
+])
+
+class SymbolCache:
+    def __init__(self, ttl):
+        self._ttl = ttl
+        self._entries = {}
+        self._filling = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        entry = self._entries.get(symbol)
+        if entry is not None and time.monotonic() - entry[1] < self._ttl:
+            return entry[0]
+        return self._load(symbol)
+
+    def _load(self, symbol):
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            return None
+
+        visible = info.visible
+        if not visible:
+            visible = bool(mt5.symbol_select(symbol, True))
+
+        meta = SymbolMeta(
+            name=info.name,
+            visible=visible,
+            point=info.point,
+            digits=info.digits,
+            trade_stops_level=info.trade_stops_level,
+            filling_mode=info.filling_mode,
+            volume_min=info.volume_min,
+            volume_max=info.volume_max,
+            volume_step=info.volume_step,
+        )
+        if visible:
+            with self._lock:
+                self._entries[symbol] = (meta, time.monotonic())
+        return meta
+
+    def filling_modes(self, symbol, market):
+        meta = self.get(symbol)
+        flags = meta.filling_mode if meta is not None else 0
+        supported = []
+        if flags & mt5.SYMBOL_FILLING_IOC:
+            supported.append(mt5.ORDER_FILLING_IOC)
+        if flags & mt5.SYMBOL_FILLING_FOK:
+            supported.append(mt5.ORDER_FILLING_FOK)
+        modes = supported + [mt5.ORDER_FILLING_RETURN] if market else [mt5.ORDER_FILLING_RETURN] + supported
+        remembered = self._filling.get((symbol, market))
+        if remembered in modes:
+            modes.remove(remembered)
+            modes.insert(0, remembered)
+        return modes
+
+    def remember_filling(self, symbol, market, mode):
+        with self._lock:
+            self._filling[(symbol, market)] = mode
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+                self._filling.clear()
+            else:
+                self._entries.pop(symbol, None)
+                self._filling.pop((symbol, True), None)
+                self._filling.pop((symbol, False), None)
+
+    def warm(self, symbols):
+        for symbol in symbols:
+            if self._load(symbol) is None:
+                logging.warning(f"Simbolo {symbol} non trovato durante il preriscaldamento della cache")
+        logging.info(f"Cache simboli preriscaldata: {', '.join(self._entries)}")
+
+    def snapshot(self):
+        now = time.monotonic()
+        return {
+            symbol: dict(meta._asdict(), age=round(now - loaded, 3),
+                         filling={"market": self._filling.get((symbol, True)), "pending": self._filling.get((symbol, False))})
+            for symbol, (meta, loaded) in list(self._entries.items())
+        }
+
+symbol_cache = SymbolCache(config.SYMBOL_CACHE_TTL)
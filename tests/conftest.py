@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["MT5_MODULE"] = "fake_mt5"
+os.environ["HISTORY_DB"] = ""
+os.environ["SNAPSHOT_INTERVAL"] = "0"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.mkdtemp(prefix="apim-tests-"), "trading_api.log"))
+
+import pytest
+
+@pytest.fixture
+def terminal():
+    import fake_mt5
+    from order_book import order_book
+    from session import session
+    from singleflight import flights
+
+    fake_mt5.configure(latency=0.0, latency_per_row=0.0, failure_rate=0.0)
+    assert session.start()
+    order_book.invalidate()
+    flights.forget()
+    yield fake_mt5.terminal
+
+@pytest.fixture
+def client(terminal):
+    from server import app
+    return app.test_client()
+
+@pytest.fixture
+def calls(monkeypatch):
+    from executor import mt5
+    counts = {}
+
+    def count(name):
+        original = getattr(mt5, name)
+
+        def counted(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(mt5, name, counted)
+
+    for name in ("orders_get", "order_send", "positions_get", "history_deals_get", "history_orders_get"):
+        count(name)
+    return counts
@@ -0,0 +1,41 @@
+import threading
+import pytest
+from admission import HISTORY, Held, Lane, LaneBusy, admit, current_priority, lanes
+
+def test_shedding_lane_rejects_beyond_limit():
+    lane = Lane("test", 2, limit=1, shed=True)
+    lane.acquire()
+    with pytest.raises(LaneBusy):
+        lane.acquire()
+    assert lane.rejected == 1
+
+    lane.release()
+    lane.acquire()
+    assert lane.in_flight == 1
+
+def test_waiting_lane_blocks_until_release():
+    lane = Lane("test", 0, limit=1)
+    lane.acquire()
+    admitted = threading.Event()
+    waiter = threading.Thread(target=lambda: (lane.acquire(), admitted.set()))
+    waiter.start()
+
+    assert not admitted.wait(0.05)
+    lane.release()
+    assert admitted.wait(1)
+    waiter.join()
+
+def test_admit_sets_the_lane_priority():
+    with admit(HISTORY):
+        assert current_priority() == lanes[HISTORY].priority
+
+def test_held_stream_releases_the_lane_when_closed():
+    lane = lanes[HISTORY]
+    before = lane.in_flight
+    held = Held(HISTORY, iter([b"a", b"b"]))
+    assert lane.in_flight == before + 1
+
+    assert next(iter(held)) == b"a"
+    held.close()
+    held.close()
+    assert lane.in_flight == before
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+import fake_mt5
+from analytics import DAY, DailyPnl, group_by
+
+def test_group_by_sums_each_key_combination():
+    columns = {
+        "symbol": np.array(["EURUSD", "GBPUSD", "EURUSD", "EURUSD"], dtype=object),
+        "magic": np.array([1, 1, 2, 1], dtype=np.int64),
+        "profit": np.array([10.0, -5.0, 2.5, 1.5]),
+        "deals": np.ones(4, np.int64),
+    }
+    grouped = group_by(columns, ("symbol", "magic"), ("profit", "deals"))
+
+    rows = list(zip(grouped["symbol"].tolist(), grouped["magic"].tolist(), grouped["profit"].tolist(),
+                    grouped["deals"].tolist()))
+    assert rows == [("EURUSD", 1, 11.5, 2), ("EURUSD", 2, 2.5, 1), ("GBPUSD", 1, -5.0, 1)]
+    assert grouped["deals"].dtype == np.int64
+
+    totals = group_by(columns, (), ("profit", "deals"))
+    assert totals["profit"].tolist() == [9.0] and totals["deals"].tolist() == [4]
+
+@pytest.fixture
+def days():
+    today = int(datetime.now(timezone.utc).timestamp()) // DAY * DAY
+    return today - 3 * DAY, today - 2 * DAY
+
+def expected_profit(day):
+    start = datetime.fromtimestamp(day, timezone.utc).replace(tzinfo=None)
+    deals = fake_mt5.history_deals_get(start, start + timedelta(seconds=DAY - 1))
+    return sum(deal.profit for deal in deals if deal.type in (fake_mt5.DEAL_TYPE_BUY, fake_mt5.DEAL_TYPE_SELL))
+
+def test_daily_pnl_matches_the_deals_and_reuses_closed_days(terminal, calls, days):
+    pnl = DailyPnl(close_delay=0)
+    first = pnl.range(*days)
+
+    totals = group_by(first, ("day",))
+    assert totals["day"].tolist() == list(days)
+    assert totals["profit"] == pytest.approx([expected_profit(day) for day in days])
+    assert pnl.stats() == {"closed_days": 2, "computed": 2, "reused": 0}
+
+    calls.clear()
+    second = pnl.range(*days)
+    assert calls == {}
+    assert pnl.stats() == {"closed_days": 2, "computed": 2, "reused": 2}
+    assert group_by(second, ("day",))["profit"].tolist() == totals["profit"].tolist()
+
+def test_open_days_are_not_cached(terminal, days):
+    pnl = DailyPnl(close_delay=10 * DAY)
+    pnl.range(*days)
+    assert pnl.stats()["closed_days"] == 0
@@ -0,0 +1,78 @@
+import threading
+import time
+import pytest
+import config
+from executor import NO_ERROR, CallTimeout, MT5Executor
+
+@pytest.fixture
+def blocked(monkeypatch):
+    monkeypatch.setattr(config, "MT5_CALL_TIMEOUT", 0.1)
+    executor = MT5Executor("test-executor")
+    release = threading.Event()
+    executor.submit(0, release.wait)
+    yield executor, release
+    release.set()
+
+def test_queued_call_is_cancelled_on_timeout(blocked):
+    executor, release = blocked
+    ran = []
+
+    with pytest.raises(CallTimeout) as error:
+        executor.call(ran.append, "order")
+    assert not error.value.running
+
+    release.set()
+    executor.call(lambda: None)
+    assert ran == []
+
+def test_running_call_reports_unknown_outcome(monkeypatch):
+    monkeypatch.setattr(config, "MT5_CALL_TIMEOUT", 0.05)
+    executor = MT5Executor("test-executor")
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return True
+
+    with pytest.raises(CallTimeout) as error:
+        executor.call(slow)
+    assert started.is_set()
+    assert error.value.running
+
+def test_last_error_is_read_with_each_failed_call():
+    errors = threading.local()
+
+    def fail(code):
+        errors.value = (code, f"errore {code}")
+        time.sleep(0.001)
+        return None
+
+    executor = MT5Executor("test-executor", error_reader=lambda: errors.value)
+    mismatched = []
+
+    def client(code):
+        for _ in range(20):
+            assert executor.call(fail, code) is None
+            if executor.last_error() != (code, f"errore {code}"):
+                mismatched.append(code)
+
+    threads = [threading.Thread(target=client, args=(-code,)) for code in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mismatched == []
+
+    assert executor.call(lambda: 1) == 1
+    assert executor.last_error() == NO_ERROR
+
+def test_higher_priority_calls_run_first(blocked):
+    executor, release = blocked
+    order = []
+    futures = [executor.submit(priority, order.append, name) for priority, name in ((2, "history"), (0, "order"), (1, "snapshot"))]
+
+    release.set()
+    for future in futures:
+        future.result(timeout=1)
+    assert order == ["order", "snapshot", "history"]
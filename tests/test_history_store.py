@@ -0,0 +1,91 @@
+import calendar
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+import config
+import fake_mt5
+import history_store
+from history_store import HistoryStore, to_msc
+
+@pytest.fixture
+def store(terminal, monkeypatch):
+    monkeypatch.setattr(config, "HISTORY_WINDOW_HOURS", 6)
+    store = HistoryStore(":memory:")
+    store.bind(1)
+    return store
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [datetime.now()]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    monkeypatch.setattr(history_store, "datetime", Clock)
+    monkeypatch.setattr(fake_mt5, "time", SimpleNamespace(**{
+        **vars(time), "time": lambda: calendar.timegm(now[0].timetuple())}))
+    return now
+
+def past_day(days):
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    return day, day + timedelta(hours=23, minutes=59, seconds=59)
+
+def test_backfill_covers_only_the_requested_range_in_windows(store, calls):
+    start, stop = past_day(10)
+    rows = store.deals.query(start, stop)
+
+    assert rows
+    assert all(to_msc(start) <= row.time_msc <= to_msc(stop) + 999 for row in rows)
+    assert calls == {"history_deals_get": 4}
+
+    calls.clear()
+    assert store.deals.query(start, stop) == rows
+    assert calls == {}
+
+def test_extending_the_range_fetches_only_the_gap(store, calls):
+    start, stop = past_day(10)
+    store.deals.query(start, stop)
+    calls.clear()
+
+    store.deals.query(start - timedelta(days=1), stop)
+    assert calls == {"history_deals_get": 4}
+
+def test_binding_another_account_resets_the_store(store, calls):
+    start, stop = past_day(10)
+    store.deals.query(start, stop)
+    store.bind(1)
+    calls.clear()
+    store.deals.query(start, stop)
+    assert calls == {}
+
+    store.bind(2)
+    assert store.db.execute("SELECT COUNT(*) FROM deals").fetchone()[0] == 0
+    store.deals.query(start, stop)
+    assert calls == {"history_deals_get": 4}
+
+def test_day_queried_while_open_is_completed_after_it_closes(store, clock):
+    start, stop = past_day(10)
+    clock[0] = start + timedelta(hours=12)
+    partial = store.deals.query(start, stop)
+
+    clock[0] = stop + timedelta(seconds=config.HISTORY_STORE_SETTLE + 1)
+    rows = store.deals.query(start, stop)
+    assert len(partial) < len(rows) == len(fake_mt5.history_deals_get(start, stop))
+
+def test_idle_account_refreshes_only_the_open_tail(store, clock, calls, monkeypatch):
+    store.deals.query(*past_day(60))
+    monkeypatch.setitem(fake_mt5.settings, "deals_per_day", 0)
+    monkeypatch.setattr(config, "HISTORY_STORE_SYNC_INTERVAL", 0)
+    start, stop = past_day(1)
+    clock[0] = start + timedelta(hours=20)
+    calls.clear()
+
+    store.deals.query(start, stop)
+    assert calls == {"history_deals_get": 5}
+
+    calls.clear()
+    store.deals.query(start, stop)
+    assert calls == {"history_deals_get": 1}
@@ -0,0 +1,22 @@
+import logging
+from logs import AUDIT, RateLimitFilter
+
+def record(level, line, audit=False):
+    record = logging.LogRecord("test", level, "protocol.py", line, "messaggio", (), None)
+    if audit:
+        record.__dict__.update(AUDIT)
+    return record
+
+def passed(rate_limit, level, audit=False, count=10):
+    return sum(rate_limit.filter(record(level, 1 + audit + level, audit)) for _ in range(count))
+
+def test_info_lines_are_limited_per_call_site():
+    rate_limit = RateLimitFilter(window=60, burst=3)
+    assert passed(rate_limit, logging.INFO) == 3
+    assert passed(rate_limit, logging.DEBUG) == 3
+
+def test_warnings_and_audit_lines_are_never_limited():
+    rate_limit = RateLimitFilter(window=60, burst=3)
+    assert passed(rate_limit, logging.WARNING) == 10
+    assert passed(rate_limit, logging.ERROR) == 10
+    assert passed(rate_limit, logging.INFO, audit=True) == 10
@@ -0,0 +1,49 @@
+import io
+import numpy as np
+import fake_mt5
+from market_data import BAR_DTYPE, resample_bars, resample_ticks
+from serialization import to_npy
+
+def test_bars_are_resampled_on_period_boundaries():
+    rates = np.zeros(4, dtype=fake_mt5.RATES_DTYPE)
+    rates["time"] = [600, 660, 720, 900]
+    rates["open"] = [1.0, 2.0, 3.0, 4.0]
+    rates["high"] = [1.5, 2.5, 3.5, 4.5]
+    rates["low"] = [0.5, 1.5, 2.5, 3.5]
+    rates["close"] = [1.2, 2.2, 3.2, 4.2]
+    rates["tick_volume"] = [10, 20, 30, 40]
+    rates["spread"] = [3, 1, 2, 5]
+    rates["real_volume"] = [1, 2, 3, 4]
+
+    bars = resample_bars(rates, 300)
+    assert bars.tolist() == [(600, 1.0, 3.5, 0.5, 3.2, 60, 1, 6), (900, 4.0, 4.5, 3.5, 4.2, 40, 5, 4)]
+    assert len(resample_bars(rates[:0], 300)) == 0
+
+def test_ticks_are_resampled_on_bid():
+    ticks = np.zeros(4, dtype=fake_mt5.TICKS_DTYPE)
+    ticks["time"] = [59, 60, 61, 125]
+    ticks["bid"] = [1.10, 1.12, 1.11, 1.13]
+    ticks["ask"] = [1.12, 1.13, 1.12, 1.15]
+    ticks["volume"] = [1, 2, 3, 4]
+
+    bars = resample_ticks(ticks, 60, 0.01)
+    assert bars["time"].tolist() == [0, 60, 120]
+    assert bars["open"].tolist() == [1.10, 1.12, 1.13]
+    assert bars["high"].tolist() == [1.10, 1.12, 1.13]
+    assert bars["low"].tolist() == [1.10, 1.11, 1.13]
+    assert bars["close"].tolist() == [1.10, 1.11, 1.13]
+    assert bars["tick_volume"].tolist() == [1, 2, 1]
+    assert bars["spread"].tolist() == [2, 1, 2]
+    assert bars["real_volume"].tolist() == [1, 5, 4]
+
+def test_npy_round_trips_through_numpy_load():
+    bars = np.zeros(3, dtype=BAR_DTYPE)
+    bars["time"] = [0, 60, 120]
+    bars["close"] = [1.1, 1.2, 1.3]
+
+    size, chunks = to_npy(bars)
+    data = b"".join(chunks)
+    assert len(data) == size
+    loaded = np.load(io.BytesIO(data))
+    assert loaded.dtype == BAR_DTYPE
+    assert loaded.tolist() == bars.tolist()
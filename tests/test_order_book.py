@@ -0,0 +1,51 @@
+from order_book import order_book
+from protocol import create_order, delete_order, update_order, update_orders
+
+def place(symbol="EURUSD", price=1.0, sl=0.9, tp=1.2):
+    result = create_order(symbol, "buy_limit", 0.1, price, sl, tp)
+    assert result.success, result.message
+    return result.payload
+
+def test_order_placed_makes_no_terminal_call(terminal, calls):
+    place()
+    assert calls == {"order_send": 1}
+
+def test_partial_modify_keeps_values_changed_outside_the_api(terminal):
+    order_book.refresh_orders(force=True)
+    ticket = place()
+    order_book.refresh_orders(force=True)
+    terminal.orders[ticket] = terminal.orders[ticket]._replace(tp=1.3)
+
+    result = update_order(ticket, stop_loss=0.95)
+    assert result.success, result.message
+    order = terminal.orders[ticket]
+    assert (order.price_open, order.sl, order.tp) == (1.0, 0.95, 1.3)
+    assert order_book.orders.by_ticket[ticket].tp == 1.3
+
+def test_partial_modify_reads_one_order(terminal, calls):
+    ticket = place()
+    calls.clear()
+    assert update_order(ticket, price=1.01).success
+    assert calls == {"orders_get": 1, "order_send": 1}
+
+def test_modify_of_unknown_order_is_not_found(terminal):
+    result = update_order(123)
+    assert not result.success
+    assert result.status == 404
+
+def test_batch_modify_refreshes_once(terminal, calls):
+    tickets = [place(), place()]
+    calls.clear()
+    result = update_orders([{"ticket": ticket, "stop_loss": 0.8} for ticket in tickets])
+    assert result.payload["succeeded"] == 2
+    assert calls == {"orders_get": 1, "order_send": 2}
+
+def test_cancel_is_one_terminal_call(terminal, calls):
+    ticket = place()
+    calls.clear()
+    assert delete_order(ticket).success
+    assert calls == {"order_send": 1}
+    assert ticket not in terminal.orders
+
+    result = delete_order(ticket)
+    assert not result.success
@@ -0,0 +1,39 @@
+import pytest
+import config
+import fake_mt5
+from protocol import create_order
+from symbols import symbol_cache
+
+@pytest.fixture
+def symbols(terminal):
+    symbol_cache.invalidate()
+    yield symbol_cache
+    symbol_cache.invalidate()
+
+def test_invalid_fill_falls_back_to_the_next_allowed_mode(symbols, monkeypatch):
+    assert symbols.filling_modes("EURUSD", True) == [
+        fake_mt5.ORDER_FILLING_IOC, fake_mt5.ORDER_FILLING_FOK, fake_mt5.ORDER_FILLING_RETURN]
+    monkeypatch.setitem(fake_mt5.SYMBOL_FILLING, "EURUSD", fake_mt5.SYMBOL_FILLING_FOK)
+
+    result = create_order("EURUSD", "buy", 0.1)
+    assert result.success
+    assert [(a["type_filling"], a["retcode"]) for a in result.attempts] == [
+        (fake_mt5.ORDER_FILLING_IOC, fake_mt5.TRADE_RETCODE_INVALID_FILL),
+        (fake_mt5.ORDER_FILLING_FOK, fake_mt5.TRADE_RETCODE_DONE),
+    ]
+
+    result = create_order("EURUSD", "buy", 0.1)
+    assert [a["type_filling"] for a in result.attempts] == [fake_mt5.ORDER_FILLING_FOK]
+
+def test_requotes_are_retried_up_to_the_limit(symbols, monkeypatch):
+    monkeypatch.setitem(fake_mt5.settings, "requote_rate", 1.0)
+    monkeypatch.setattr(config, "ORDER_REQUOTE_RETRIES", 2)
+
+    result = create_order("EURUSD", "buy", 0.1)
+    assert not result.success and result.status == 400
+    assert result.retcode == fake_mt5.TRADE_RETCODE_REQUOTE
+    assert [a["retcode"] for a in result.attempts] == [fake_mt5.TRADE_RETCODE_REQUOTE] * 3
+
+    monkeypatch.setitem(fake_mt5.settings, "requote_rate", 0.0)
+    result = create_order("EURUSD", "buy", 0.1)
+    assert result.success and len(result.attempts) == 1
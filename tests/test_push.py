@@ -0,0 +1,29 @@
+from protocol import create_order
+from push import Broadcaster
+from snapshots import poller
+
+def events(subscriber):
+    return [(stream, data["event"]) for stream, data in subscriber.drain(0.1)]
+
+def test_broadcaster_started_after_the_first_poll_keeps_the_snapshot(terminal):
+    poller.invalidate()
+    poller.poll()
+    broadcaster = Broadcaster(3600.0, 100)
+    broadcaster.start()
+
+    subscriber = broadcaster.subscribe(set(), {"orders"})
+    assert events(subscriber) == [("orders", "snapshot")]
+
+    ticket = create_order("EURUSD", "buy_limit", 0.1, 1.0).payload
+    poller.poll()
+    assert [(stream, data["data"]["ticket"]) for stream, data in subscriber.drain(0.1)] == [("orders", ticket)]
+
+def test_subscribers_before_the_first_snapshot_receive_it(terminal):
+    poller.invalidate()
+    broadcaster = Broadcaster(3600.0, 100)
+    broadcaster.start()
+    subscriber = broadcaster.subscribe(set(), {"orders", "positions"})
+    assert events(subscriber) == []
+
+    poller.poll()
+    assert sorted(events(subscriber)) == [("orders", "snapshot"), ("positions", "snapshot")]
@@ -0,0 +1,26 @@
+from datetime import datetime
+from serialization import DEAL_FIELDS, POSITION_FIELDS, to_columns, to_records, to_rows
+
+def reference(rows, spec):
+    return [dict(zip(spec.names, spec.getter(row))) for row in rows]
+
+def test_records_match_the_field_spec(terminal):
+    import fake_mt5
+    deals = fake_mt5.history_deals_get(datetime(2026, 10, 1), datetime(2026, 10, 2))
+    positions = fake_mt5.positions_get()
+    assert deals and positions
+
+    for spec in (DEAL_FIELDS, DEAL_FIELDS.project(["profit", "ticket"]), DEAL_FIELDS.project(["time"])):
+        assert to_records(deals, spec) == reference(deals, spec)
+    assert to_records(positions, POSITION_FIELDS) == reference(positions, POSITION_FIELDS)
+    assert to_records((), DEAL_FIELDS) == []
+
+def test_rows_and_columns_hold_the_same_values(terminal):
+    import fake_mt5
+    deals = fake_mt5.history_deals_get(datetime(2026, 10, 1), datetime(2026, 10, 2))
+    records = to_records(deals, DEAL_FIELDS)
+    rows = to_rows(deals, DEAL_FIELDS)
+    columns = to_columns(deals, DEAL_FIELDS)
+
+    assert [dict(zip(rows["fields"], row)) for row in rows["rows"]] == records
+    assert columns["columns"]["ticket"] == [record["ticket"] for record in records]
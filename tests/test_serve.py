@@ -0,0 +1,42 @@
+import threading
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from serve import Drain, StreamSlots
+
+def test_drain_waits_for_writes_and_rejects_new_ones():
+    drain = Drain()
+    entered = threading.Event()
+    release = threading.Event()
+
+    def app(environ, start_response):
+        if environ["REQUEST_METHOD"] == "POST":
+            entered.set()
+            release.wait(1)
+        return Response("ok")(environ, start_response)
+
+    client = Client(drain.wrap(app))
+    statuses = []
+    writer = threading.Thread(target=lambda: statuses.append(client.post("/orders", buffered=True).status_code))
+    writer.start()
+    entered.wait(1)
+
+    drain.begin()
+    assert not drain.wait(0.05)
+    assert client.post("/orders", buffered=True).status_code == 503
+    assert client.get("/orders", buffered=True).status_code == 200
+
+    release.set()
+    writer.join()
+    assert drain.wait(1)
+    assert statuses == [200]
+    assert drain.stats() == {"draining": True, "in_flight": 0, "rejected": 1}
+
+def test_stream_slots_release_when_the_body_is_closed():
+    slots = StreamSlots(1)
+    assert slots.acquire()
+    body = slots.hold(iter(["data"]))
+    assert not slots.acquire()
+
+    body.close()
+    assert slots.acquire()
+    assert slots.stats() == {"open": 1, "limit": 1, "rejected": 1}
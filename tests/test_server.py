@@ -0,0 +1,102 @@
+import gzip
+import threading
+import time
+import pytest
+import config
+from executor import executor
+from snapshots import poller
+from serve import stream_slots
+from symbols import symbol_cache
+
+ORDER = {"symbol": "EURUSD", "type": "buy_limit", "volume": 0.1, "price": 1.0}
+
+@pytest.fixture
+def polling(terminal, monkeypatch):
+    monkeypatch.setattr(poller, "_interval", 3600.0)
+    poller.invalidate()
+    poller.start()
+    deadline = time.monotonic() + 2
+    while poller.get("placed") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield poller
+    poller.stop()
+
+def test_batch_with_malformed_item_fails_only_that_item(client):
+    response = client.post("/orders/batch", json={"orders": ["x", ORDER]})
+    assert response.status_code == 200
+    first, second = response.get_json()["results"]
+    assert not first["success"] and "oggetto" in first["message"]
+    assert second["success"]
+
+def test_order_timed_out_in_queue_is_not_sent(client, terminal, monkeypatch):
+    symbol_cache.get("EURUSD")
+    before = set(terminal.orders)
+    monkeypatch.setattr(config, "MT5_CALL_TIMEOUT", 0.1)
+    release = threading.Event()
+    executor.submit(0, release.wait)
+    try:
+        response = client.post("/orders", json=ORDER)
+    finally:
+        release.set()
+
+    assert response.status_code == 503
+    assert response.get_json()["outcome"] == "not_sent"
+    executor.call(lambda: None)
+    assert set(terminal.orders) == before
+
+def test_new_order_is_visible_right_after_the_write(client, polling):
+    assert client.get("/orders?status=placed").headers.get("ETag")
+    ticket = client.post("/orders", json=ORDER).get_json()["order_id"]
+
+    tickets = [order["ticket"] for order in client.get("/orders?status=placed").get_json()["orders"]]
+    assert ticket in tickets
+
+def test_gzip_snapshot_has_its_own_etag(client, polling, monkeypatch):
+    monkeypatch.setattr(config, "GZIP_MIN_BYTES", 1)
+    plain = client.get("/orders?status=placed")
+    compressed = client.get("/orders?status=placed", headers={"Accept-Encoding": "gzip"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == plain.data
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+
+    for response in (plain, compressed):
+        headers = {"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}
+        revalidated = client.get("/orders?status=placed", headers=headers)
+        assert revalidated.status_code == 304
+        assert revalidated.headers["ETag"] == response.headers["ETag"]
+
+def test_streams_beyond_the_limit_are_rejected(client, monkeypatch):
+    monkeypatch.setattr(stream_slots, "limit", 1)
+    first = client.get("/stream?streams=account", buffered=False)
+    assert first.status_code == 200
+
+    second = client.get("/stream?streams=account", buffered=False)
+    assert second.status_code == 503
+    assert second.headers["Retry-After"]
+
+    first.close()
+    third = client.get("/stream?streams=account", buffered=False)
+    assert third.status_code == 200
+    third.close()
+    assert stream_slots.open == 0
+
+def test_healthz_answers_without_the_terminal(client):
+    assert client.get("/healthz").get_json() == {"status": "ok"}
+
+def test_history_is_read_in_short_windows(client, calls):
+    response = client.get("/orders?status=historyDeals&from_date=01/10/2026&to_date=04/10/2026")
+    assert response.status_code == 200
+    assert calls == {"history_deals_get": int(72 / config.HISTORY_WINDOW_HOURS)}
+
+def test_totals_are_exported_as_counters(client):
+    types = dict(line.split()[2:4] for line in client.get("/metrics").text.splitlines() if line.startswith("# TYPE"))
+    for name in ("apim_mt5_initialize_total", "apim_mt5_reconnect_total", "apim_lane_rejected_total",
+                 "apim_coalesced_total", "apim_log_dropped_total"):
+        assert types[name] == "counter"
+    assert types["apim_executor_queue_depth"] == types["apim_lane_in_flight"] == "gauge"
+
+def test_account_disconnect_shuts_the_terminal_down(client, terminal):
+    response = client.delete("/account")
+    assert response.status_code == 200
+    assert not terminal.connected
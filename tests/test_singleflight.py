@@ -0,0 +1,54 @@
+import threading
+import time
+from singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    entered = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def fetch():
+        runs.append(1)
+        entered.set()
+        release.wait(1)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", fetch)))
+    leader.start()
+    entered.wait(1)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("key", fetch))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert runs == [1]
+    assert results == ["value"] * 4
+
+def test_results_are_cached_only_when_accepted():
+    flights = SingleFlight()
+    assert flights.do("bad", lambda: "error", ttl=10, cache_if=lambda value: value == "ok") == "error"
+    assert flights.do("bad", lambda: "ok", ttl=10, cache_if=lambda value: value == "ok") == "ok"
+    assert flights.do("bad", lambda: "other", ttl=10) == "ok"
+
+def test_expired_results_are_removed_on_insert():
+    flights = SingleFlight()
+    for key in range(10):
+        flights.do(key, lambda: key, ttl=0.01)
+    time.sleep(0.02)
+
+    flights.do("new", lambda: 1, ttl=10)
+    assert flights.stats()["results"] == 1
+
+def test_cache_is_bounded():
+    flights = SingleFlight(max_results=3)
+    for key in range(10):
+        flights.do(key, lambda: key, ttl=10)
+
+    assert flights.stats()["results"] == 3
+    assert flights.do(9, lambda: "fresh", ttl=10) == 9
+    assert flights.do(0, lambda: "fresh", ttl=10) == "fresh"